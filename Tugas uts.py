@@ -1,9 +1,61 @@
 import mysql.connector
 import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import io
+import json
+import os
+import pydoc
+import random
+import re
+import shutil
+import sqlite3
 import sys
+import threading
+import time
+import tracemalloc
+import unicodedata
 
 class ZakatManager:
+    # Rows moved per transaction when archiving closed years
+    ARCHIVE_BATCH_SIZE = 1000
+    # Rows sent per executemany call during the donor migration
+    MIGRATION_BATCH_SIZE = 1000
+    # Minimum trigram similarity (0-1) for a donor to be offered as a match
+    DONOR_MATCH_THRESHOLD = 0.3
+    # Statements handed to a worker process at a time
+    STATEMENT_CHUNK_SIZE = 50
+    # Profiling mode: JSON-lines report file, traced stack depth and number of allocation hot spots kept
+    PROFILE_REPORT_FILE = "zakat_profile.jsonl"
+    PROFILE_TRACE_FRAMES = 1
+    PROFILE_TOP_ALLOCATIONS = 10
+    # Table rendering: rows sampled for column widths, widest text column, rows formatted per batch
+    TABLE_SAMPLE_SIZE = 500
+    TABLE_MAX_COLUMN_WIDTH = 40
+    TABLE_BATCH_SIZE = 1000
+    # Listing results kept per session before the least recently used is evicted
+    CACHE_MAX_ENTRIES = 32
+    # Tables whose changes are counted by triggers so cached listings can be validated cheaply
+    VERSIONED_TABLES = ("zakat_data", "transaksi_zakat", "master_beras")
+    # Integrity scan: ids per worker task, allowed rounding difference, and exit status codes
+    INTEGRITY_CHUNK_SIZE = 10000
+    INTEGRITY_TOLERANCE = 0.01
+    INTEGRITY_OK = 0
+    INTEGRITY_VIOLATIONS = 1
+    INTEGRITY_ERROR = 2
+    # Checks reported as warnings only: totals are compared with today's rice prices because
+    # price history isn't kept, so a repricing makes every earlier distribution differ
+    INTEGRITY_WARNING_CHECKS = ("total_harga_mismatch",)
+    INTEGRITY_PRICE_NOTE = ("total_harga is compared with the current harga_per_kg; mismatches may come "
+                            "from a later price change and do not affect the exit status")
+    
     def __init__(self):
         self.db_config = {
             "host": "localhost",
@@ -12,6 +64,11 @@ class ZakatManager:
             "database": "zakat"
         }
         self.connection = None
+        self.profiling = False
+        self.profile = None
+        self.query_cache = OrderedDict()
+        self.cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.change_counters_ready = None
     
     def create_connection(self):
         """Create a secure database connection with enhanced error handling"""
@@ -87,6 +144,18 @@ class ZakatManager:
                 return date_input
             print("⚠️ Invalid date format. Please use YYYY-MM-DD format (e.g., 2023-12-31).")
     
+    def get_date_range(self):
+        """Optionally ask for a start and end date; archived years are only searched when asked for"""
+        if not self.confirm_action("Would you like to filter by date range?"):
+            return None, None
+        while True:
+            start_date = self.get_valid_date("Enter start date (YYYY-MM-DD, blank for none): ", allow_empty=True)
+            end_date = self.get_valid_date("Enter end date (YYYY-MM-DD, blank for none): ", allow_empty=True)
+            if start_date and end_date and start_date > end_date:
+                print("⚠️ Start date cannot be after end date. Please try again.")
+                continue
+            return start_date, end_date
+    
     def get_non_empty_input(self, prompt, field_name):
         """Get non-empty input with validation"""
         while True:
@@ -113,15 +182,392 @@ class ZakatManager:
             print(f"{key.replace('_', ' ').title()}: {value}")
         print()
     
+    def format_cell(self, value, number_format=None):
+        """Format one table cell as text"""
+        if value is None:
+            return ""
+        if number_format and isinstance(value, (int, float, Decimal)):
+            return format(value, number_format)
+        return str(value)
+    
+    def build_table(self, rows, columns, footer=None):
+        """Build the text of a table, sizing columns from a sample of the data.
+        columns is a list of (key, title, number_format) tuples; numbers are right-aligned."""
+        sample = rows[:self.TABLE_SAMPLE_SIZE]
+        layout = []
+        for key, title, number_format in columns:
+            numeric = any(isinstance(row[key], (int, float, Decimal)) for row in sample)
+            width = max([len(title)] + [len(self.format_cell(row[key], number_format)) for row in sample])
+            if not numeric:
+                width = min(width, self.TABLE_MAX_COLUMN_WIDTH)
+            layout.append((key, number_format, width, numeric))
+        
+        def cell(text, width, numeric):
+            if numeric:
+                return text.rjust(width)
+            if len(text) > width:
+                text = text[:width - 1] + "…"
+            return text.ljust(width)
+        
+        separator = "-" * (sum(width for _, _, width, _ in layout) + 2 * (len(layout) - 1))
+        buffer = io.StringIO()
+        buffer.write("\n" + separator + "\n")
+        buffer.write("  ".join(cell(title, width, numeric)
+                               for (_, title, _), (_, _, width, numeric) in zip(columns, layout)) + "\n")
+        buffer.write(separator + "\n")
+        for start in range(0, len(rows), self.TABLE_BATCH_SIZE):
+            buffer.write("\n".join(
+                "  ".join(cell(self.format_cell(row[key], number_format), width, numeric)
+                          for key, number_format, width, numeric in layout)
+                for row in rows[start:start + self.TABLE_BATCH_SIZE]
+            ) + "\n")
+        buffer.write(separator + "\n")
+        if footer:
+            buffer.write(footer + "\n")
+        return buffer.getvalue()
+    
+    def render_table(self, rows, columns, footer=None):
+        """Render rows as a table in one buffered write"""
+        self.write_output(self.build_table(rows, columns, footer))
+    
+    def write_output(self, text):
+        """Write text in one call, through the pager when it is taller than the terminal"""
+        if sys.stdout.isatty() and text.count("\n") > shutil.get_terminal_size().lines - 2:
+            pydoc.pager(text)
+        else:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+    
+    def sort_rows(self, rows, sort_keys):
+        """Sort rows in memory by keys; a leading '-' sorts that key descending.
+        Rows missing a value always come last for that key, whatever the direction."""
+        rows = list(rows)
+        for sort_key in reversed(sort_keys):
+            key = sort_key.lstrip("-")
+            present = [row for row in rows if row[key] is not None]
+            present.sort(key=lambda row: row[key], reverse=sort_key.startswith("-"))
+            rows = present + [row for row in rows if row[key] is None]
+        return rows
+    
+    def browse_table_options(self, rows, columns, footer=None):
+        """Let the user pick visible columns and sort keys, re-rendering already fetched rows"""
+        visible, sorted_rows = columns, rows
+        keys = [key for key, _, _ in columns]
+        while self.confirm_action("\nWould you like to change visible columns or sort order?"):
+            print(f"Available columns: {', '.join(keys)}")
+            chosen = [key.strip() for key in input("Columns to show (comma-separated, blank for all): ").split(",") if key.strip()]
+            unknown = [key for key in chosen if key not in keys]
+            sort_keys = [key.strip() for key in input("Sort by (e.g. -tanggal,nama; blank to keep): ").split(",") if key.strip()]
+            unknown += [key for key in sort_keys if key.lstrip("-") not in keys]
+            if unknown:
+                print(f"⚠️ Unknown column(s): {', '.join(unknown)}")
+                continue
+            visible = [column for column in columns if column[0] in chosen] if chosen else columns
+            if sort_keys:
+                sorted_rows = self.sort_rows(rows, sort_keys)
+            self.render_table(sorted_rows, visible, footer)
+    
+    def build_date_filter(self, column, start_date=None, end_date=None):
+        """Build WHERE conditions and parameters for an optional date range"""
+        conditions, params = [], []
+        if start_date:
+            conditions.append(f"{column} >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append(f"{column} <= %s")
+            params.append(end_date)
+        return conditions, params
+    
+    def get_archived_through(self, cursor):
+        """Return the latest archived year, or None if nothing has been archived yet"""
+        try:
+            cursor.execute("SELECT MAX(tahun) AS tahun FROM archive_log")
+            row = cursor.fetchone()
+        except mysql.connector.Error as err:
+            if err.errno == 1146:  # Table doesn't exist: archiving never ran
+                return None
+            raise
+        if not row:
+            return None
+        return row['tahun'] if isinstance(row, dict) else row[0]
+    
+    def table_sources(self, cursor, start_date=None, end_date=None):
+        """Return the (zakat_data, transaksi_zakat) sources for a date range: the hot tables,
+        or hot + archive rows when the range reaches archived years"""
+        archived_through = self.get_archived_through(cursor)
+        if start_date:
+            reaches_archive = archived_through and int(str(start_date)[:4]) <= archived_through
+        else:
+            # An open-ended range with only an end date reaches back into every archived year
+            reaches_archive = archived_through and bool(end_date)
+        if reaches_archive:
+            return tuple(f"(SELECT * FROM {table} UNION ALL SELECT * FROM {table}_archive)"
+                         for table in ("zakat_data", "transaksi_zakat"))
+        return "zakat_data", "transaksi_zakat"
+    
+    def has_change_counters(self, cursor):
+        """Check once per session whether the table_versions counters and their triggers are installed.
+        Without them (see setup_change_counters) the listing cache stays off."""
+        if self.change_counters_ready is not None:
+            return self.change_counters_ready
+        self.change_counters_ready = False
+        if self.table_exists(cursor, "table_versions"):
+            triggers = [f"trg_{table}_{event}_versi"
+                        for table in self.VERSIONED_TABLES for event in ("insert", "update", "delete")]
+            placeholders = ", ".join(["%s"] * len(triggers))
+            cursor.execute(f"""
+                SELECT COUNT(*) AS jumlah FROM information_schema.TRIGGERS
+                WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN ({placeholders})
+            """, tuple(triggers))
+            self.change_counters_ready = cursor.fetchone()['jumlah'] == len(triggers)
+        return self.change_counters_ready
+    
+    def get_table_versions(self, cursor, tables):
+        """Return the change counters of the given tables, or None if they are unavailable"""
+        if not self.has_change_counters(cursor):
+            return None
+        placeholders = ", ".join(["%s"] * len(tables))
+        cursor.execute(f"SELECT nama_tabel, versi FROM table_versions WHERE nama_tabel IN ({placeholders})",
+                       tuple(tables))
+        return tuple(sorted((row['nama_tabel'], row['versi']) for row in cursor.fetchall()))
+    
+    def cached_query(self, cursor, query, params, tables):
+        """Run a read-only listing query, reusing this session's result while its tables are unchanged.
+        A miss is profiled as separate query and fetch phases. Queries that read the archive tables
+        are never cached, since archive changes (e.g. the donor migration) are not counted."""
+        if any(f"{table}_archive" in query for table in tables):
+            versions = None
+        else:
+            with self.profile_phase("query"):
+                versions = self.get_table_versions(cursor, tables)
+        key = (query, params)
+        entry = self.query_cache.get(key)
+        if versions is not None and entry and entry["versions"] == versions:
+            self.query_cache.move_to_end(key)
+            self.count_cache("hits")
+            return entry["rows"]
+        
+        self.count_cache("misses")
+        with self.profile_phase("query"):
+            cursor.execute(query, params)
+        with self.profile_phase("fetch"):
+            rows = cursor.fetchall()
+        if versions is not None:
+            self.query_cache[key] = {"versions": versions, "tables": set(tables), "rows": rows}
+            self.query_cache.move_to_end(key)
+            if len(self.query_cache) > self.CACHE_MAX_ENTRIES:
+                self.query_cache.popitem(last=False)
+                self.count_cache("evictions")
+        return rows
+    
+    def count_cache(self, event):
+        """Count a cache hit, miss or eviction for the session and the running profile"""
+        self.cache_stats[event] += 1
+        if self.profile is not None:
+            self.profile["cache"][event] += 1
+    
+    def invalidate_cache(self, *tables):
+        """Drop cached listings that read any of the given tables (all of them if none are given)"""
+        for key in [key for key, entry in self.query_cache.items()
+                    if not tables or entry["tables"] & set(tables)]:
+            del self.query_cache[key]
+    
+    def start_profile(self, operation):
+        """Start recording time and memory for an operation when profiling mode is on"""
+        self.profile = None
+        if not self.profiling:
+            return
+        tracemalloc.start(self.PROFILE_TRACE_FRAMES)
+        self.profile = {
+            "operation": operation,
+            "started": time.perf_counter(),
+            "rows": 0,
+            "phases": {},
+            "peak_bytes": 0,
+            "snapshot": None,
+            "snapshot_bytes": 0,
+            "cache": {"hits": 0, "misses": 0, "evictions": 0},
+        }
+    
+    @contextmanager
+    def profile_phase(self, phase):
+        """Time a phase (query, fetch, transform, write) and record its peak traced memory"""
+        if self.profile is None:
+            yield
+            return
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            stats = self.profile["phases"].setdefault(phase, {"seconds": 0.0, "peak_bytes": 0})
+            stats["seconds"] += time.perf_counter() - started
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+            self.profile["peak_bytes"] = max(self.profile["peak_bytes"], peak)
+            # Keep the snapshot taken when the most memory was still held, to find the hot spots
+            if current > self.profile["snapshot_bytes"]:
+                self.profile["snapshot"] = tracemalloc.take_snapshot()
+                self.profile["snapshot_bytes"] = current
+    
+    def discard_profile(self):
+        """Stop profiling without writing a report (e.g. after an error)"""
+        if self.profile is not None:
+            self.profile = None
+            tracemalloc.stop()
+    
+    def finish_profile(self, rows):
+        """Stop profiling and append a machine-readable report line"""
+        profile = self.profile
+        if profile is None:
+            return
+        self.profile = None
+        snapshot = profile["snapshot"] or tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        
+        seconds = time.perf_counter() - profile["started"]
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "operation": profile["operation"],
+            "rows": rows,
+            "seconds": round(seconds, 4),
+            "peak_bytes": profile["peak_bytes"],
+            "peak_bytes_per_100k_rows": round(profile["peak_bytes"] * 100000 / rows) if rows else None,
+            "phases": {
+                phase: {"seconds": round(stats["seconds"], 4), "peak_bytes": stats["peak_bytes"]}
+                for phase, stats in profile["phases"].items()
+            },
+            "cache": profile["cache"],
+            "session_cache_hit_rate": self.cache_hit_rate(),
+            "top_allocations": [
+                {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:self.PROFILE_TOP_ALLOCATIONS]
+            ],
+        }
+        try:
+            with open(self.PROFILE_REPORT_FILE, "a") as f:
+                f.write(json.dumps(report) + "\n")
+        except IOError as e:
+            print(f"⚠️ Failed to write profile report: {e}")
+            return
+        print(f"\n📊 Profile: {profile['operation']} | {rows} rows | {seconds:.2f}s | "
+              f"peak {profile['peak_bytes'] / 1024 / 1024:.1f} MiB → '{self.PROFILE_REPORT_FILE}'")
+        if report["session_cache_hit_rate"] is not None:
+            print(f"   Listing cache: {self.cache_stats['hits']} hits, {self.cache_stats['misses']} misses "
+                  f"({report['session_cache_hit_rate']:.0%} hit rate this session)")
+    
+    def cache_hit_rate(self):
+        """Return the session's listing cache hit rate (0-1), or None before any lookup"""
+        lookups = self.cache_stats["hits"] + self.cache_stats["misses"]
+        return round(self.cache_stats["hits"] / lookups, 4) if lookups else None
+    
+    def toggle_profiling(self):
+        """Switch profiling mode on or off for this session"""
+        self.profiling = not self.profiling
+        state = "ON" if self.profiling else "OFF"
+        print(f"\nProfiling mode is now {state}.")
+        if self.profiling:
+            print(f"Exports, backups and listings will append reports to '{self.PROFILE_REPORT_FILE}'.")
+    
+    def table_exists(self, cursor, table):
+        """Check whether a table exists in the current database"""
+        cursor.execute("""
+            SELECT COUNT(*) AS jumlah FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        return cursor.fetchone()['jumlah'] > 0
+    
+    def normalize_name(self, nama):
+        """Normalize a donor name: strip accents and punctuation, lowercase, collapse spaces"""
+        nama = unicodedata.normalize("NFKD", nama)
+        nama = "".join(ch for ch in nama if not unicodedata.combining(ch))
+        return " ".join(re.sub(r"[^\w\s]", " ", nama.lower()).split())
+    
+    def name_trigrams(self, nama_normal):
+        """Return the set of trigrams of a normalized name, each word padded like pg_trgm"""
+        trigrams = set()
+        for word in nama_normal.split():
+            padded = f"  {word} "
+            trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return trigrams
+    
+    def search_donors(self, cursor, nama, limit=5):
+        """Find donors whose names are similar to the given one using the trigram index.
+        Returns None if the name has nothing to match on (e.g. only punctuation)
+        or the donor registry has not been migrated yet."""
+        trigrams = self.name_trigrams(self.normalize_name(nama))
+        if not trigrams:
+            return None
+        placeholders = ", ".join(["%s"] * len(trigrams))
+        try:
+            cursor.execute(f"""
+                SELECT d.id, d.nama, COUNT(*) / (%s + d.jumlah_trigram - COUNT(*)) AS similarity
+                FROM donatur_trigram g
+                JOIN donatur d ON d.id = g.id_donatur
+                WHERE g.trigram IN ({placeholders})
+                GROUP BY d.id, d.nama, d.jumlah_trigram
+                HAVING similarity >= %s
+                ORDER BY similarity DESC, d.nama
+                LIMIT %s
+            """, (len(trigrams), *trigrams, self.DONOR_MATCH_THRESHOLD, limit))
+        except mysql.connector.Error as err:
+            if err.errno == 1146:  # Registry tables don't exist yet
+                return None
+            raise
+        return cursor.fetchall()
+    
+    def get_or_create_donor(self, cursor, nama):
+        """Return the id of the donor with this normalized name, registering them if needed.
+        Returns None for names that normalize to nothing, which stay free text."""
+        nama_normal = self.normalize_name(nama)
+        if not nama_normal:
+            return None
+        cursor.execute("SELECT id FROM donatur WHERE nama_normal = %s", (nama_normal,))
+        row = cursor.fetchone()
+        if row:
+            return row['id']
+        trigrams = self.name_trigrams(nama_normal)
+        cursor.execute(
+            "INSERT INTO donatur (nama, nama_normal, jumlah_trigram) VALUES (%s, %s, %s)",
+            (nama, nama_normal, len(trigrams))
+        )
+        id_donatur = cursor.lastrowid
+        cursor.executemany(
+            "INSERT IGNORE INTO donatur_trigram (trigram, id_donatur) VALUES (%s, %s)",
+            [(trigram, id_donatur) for trigram in trigrams]
+        )
+        return id_donatur
+    
+    def select_donor(self, cursor, nama):
+        """Offer existing donors matching the typed name and return (id_donatur, nama).
+        The id is None if the donor registry has not been migrated yet or the name
+        normalizes to nothing; such records keep the typed name without a donor."""
+        matches = self.search_donors(cursor, nama)
+        if matches is None:
+            return None, nama
+        if matches:
+            print("\nExisting donors with similar names:")
+            for i, donor in enumerate(matches, start=1):
+                print(f"{i}. {donor['nama']} (ID {donor['id']}, {float(donor['similarity']):.0%} match)")
+            print(f"0. Register '{nama}' as a new donor")
+            while True:
+                choice = input(f"Select donor (0-{len(matches)}): ").strip()
+                if choice.isdigit() and int(choice) <= len(matches):
+                    break
+                print(f"⚠️ Please enter a number between 0-{len(matches)}.")
+            if choice != "0":
+                donor = matches[int(choice) - 1]
+                return donor['id'], donor['nama']
+        return self.get_or_create_donor(cursor, nama), nama
+    
     def add_zakat(self):
         """Add new zakat record with comprehensive validation"""
         print("\n--- Add New Zakat Record ---")
         
         try:
             nama = self.get_non_empty_input("Enter donor name: ", "Donor name")
-            jenis_zakat = self.get_non_empty_input("Enter zakat type: ", "Zakat type")
-            jumlah = self.get_positive_float("Enter zakat amount: ")
-            tanggal = self.get_valid_date("Enter date (YYYY-MM-DD): ")
             
             conn = self.create_connection()
             if not conn:
@@ -129,13 +575,27 @@ class ZakatManager:
                 return
             
             try:
-                cursor = conn.cursor()
-                query = """
-                INSERT INTO zakat_data (nama, jenis_zakat, jumlah, tanggal) 
-                VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal))
+                cursor = conn.cursor(dictionary=True)
+                id_donatur, nama = self.select_donor(cursor, nama)
+                
+                jenis_zakat = self.get_non_empty_input("Enter zakat type: ", "Zakat type")
+                jumlah = self.get_positive_float("Enter zakat amount: ")
+                tanggal = self.get_valid_date("Enter date (YYYY-MM-DD): ")
+                
+                if id_donatur is None:
+                    query = """
+                    INSERT INTO zakat_data (nama, jenis_zakat, jumlah, tanggal) 
+                    VALUES (%s, %s, %s, %s)
+                    """
+                    cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal))
+                else:
+                    query = """
+                    INSERT INTO zakat_data (nama, id_donatur, jenis_zakat, jumlah, tanggal) 
+                    VALUES (%s, %s, %s, %s, %s)
+                    """
+                    cursor.execute(query, (nama, id_donatur, jenis_zakat, jumlah, tanggal))
                 conn.commit()
+                self.invalidate_cache("zakat_data")
                 print("\n✅ Zakat record added successfully!")
                 print(f"Donor: {nama} | Amount: {jumlah} | Type: {jenis_zakat}")
             except mysql.connector.Error as err:
@@ -177,6 +637,9 @@ class ZakatManager:
                 
                 # Get updated values with defaults
                 nama = input(f"Enter new name [{record['nama']}]: ").strip() or record['nama']
+                id_donatur = record.get('id_donatur')
+                if 'id_donatur' in record and nama != record['nama']:
+                    id_donatur, nama = self.select_donor(cursor, nama)
                 jenis_zakat = input(f"Enter new zakat type [{record['jenis_zakat']}]: ").strip() or record['jenis_zakat']
                 
                 while True:
@@ -207,13 +670,22 @@ class ZakatManager:
                     return
                 
                 # Update record
-                query = """
-                UPDATE zakat_data 
-                SET nama = %s, jenis_zakat = %s, jumlah = %s, tanggal = %s 
-                WHERE id = %s
-                """
-                cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal, id_zakat))
+                if 'id_donatur' in record:
+                    query = """
+                    UPDATE zakat_data 
+                    SET nama = %s, id_donatur = %s, jenis_zakat = %s, jumlah = %s, tanggal = %s 
+                    WHERE id = %s
+                    """
+                    cursor.execute(query, (nama, id_donatur, jenis_zakat, jumlah, tanggal, id_zakat))
+                else:
+                    query = """
+                    UPDATE zakat_data 
+                    SET nama = %s, jenis_zakat = %s, jumlah = %s, tanggal = %s 
+                    WHERE id = %s
+                    """
+                    cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal, id_zakat))
                 conn.commit()
+                self.invalidate_cache("zakat_data")
                 print("\n✅ Zakat record updated successfully!")
             except mysql.connector.Error as err:
                 conn.rollback()
@@ -273,6 +745,7 @@ class ZakatManager:
                 # Proceed with deletion
                 cursor.execute("DELETE FROM zakat_data WHERE id = %s", (id_zakat,))
                 conn.commit()
+                self.invalidate_cache("zakat_data")
                 print("\n✅ Zakat record deleted successfully!")
             except mysql.connector.Error as err:
                 conn.rollback()
@@ -311,6 +784,7 @@ class ZakatManager:
                     cursor.execute("UPDATE master_beras SET harga_per_kg = %s WHERE nama_beras = %s", 
                                  (new_price, nama_beras))
                     conn.commit()
+                    self.invalidate_cache("master_beras")
                     print("\n✅ Rice type updated successfully!")
                     return
                 
@@ -318,6 +792,7 @@ class ZakatManager:
                 query = "INSERT INTO master_beras (nama_beras, harga_per_kg) VALUES (%s, %s)"
                 cursor.execute(query, (nama_beras, harga_per_kg))
                 conn.commit()
+                self.invalidate_cache("master_beras")
                 print("\n✅ Rice type added successfully!")
                 print(f"Name: {nama_beras} | Price: {harga_per_kg}/kg")
             except mysql.connector.Error as err:
@@ -342,22 +817,29 @@ class ZakatManager:
                 return
             
             try:
+                self.start_profile("view_master_beras")
                 cursor = conn.cursor(dictionary=True)
-                cursor.execute("SELECT * FROM master_beras ORDER BY nama_beras")
-                results = cursor.fetchall()
+                results = self.cached_query(cursor, "SELECT * FROM master_beras ORDER BY nama_beras",
+                                            None, ("master_beras",))
                 
                 if not results:
                     print("No rice types found in database.")
+                    self.finish_profile(0)
                     return
                 
                 # Display table with better formatting
-                print("\n" + "-" * 50)
-                print(f"{'ID':<5}{'Rice Name':<25}{'Price per Kg':>15}")
-                print("-" * 50)
-                for row in results:
-                    print(f"{row['id']:<5}{row['nama_beras'][:24]:<25}{row['harga_per_kg']:>15.2f}")
-                print("-" * 50)
-                print(f"Total rice types: {len(results)}")
+                columns = [
+                    ("id", "ID", None),
+                    ("nama_beras", "Rice Name", None),
+                    ("harga_per_kg", "Price per Kg", ".2f"),
+                ]
+                footer = f"Total rice types: {len(results)}"
+                # The pager may wait on the user, so it is shown only after profiling stops
+                with self.profile_phase("write"):
+                    table = self.build_table(results, columns, footer)
+                self.finish_profile(len(results))
+                self.write_output(table)
+                self.browse_table_options(results, columns, footer)
                 
                 # Additional options
                 if self.confirm_action("\nWould you like to export this data to CSV?"):
@@ -370,6 +852,7 @@ class ZakatManager:
         except Exception as e:
             print(f"⚠️ Unexpected error occurred: {e}")
         finally:
+            self.discard_profile()
             self.close_connection()
     
     def add_transaksi_zakat(self):
@@ -445,6 +928,7 @@ class ZakatManager:
                 """
                 cursor.execute(query, (id_zakat, id_beras, jumlah_beras, total_harga, tanggal))
                 conn.commit()
+                self.invalidate_cache("transaksi_zakat")
                 print("\n✅ Zakat distribution recorded successfully!")
             except mysql.connector.Error as err:
                 conn.rollback()
@@ -459,7 +943,30 @@ class ZakatManager:
         finally:
             self.close_connection()
     
-    def view_transaksi_zakat(self, filter_id=None):
+    def transaksi_query(self, cursor, filter_id=None, start_date=None, end_date=None):
+        """Build the distribution listing query for an optional zakat record and date range"""
+        # Build query based on filter; archived years only join in for old date ranges
+        zakat_source, transaksi_source = self.table_sources(cursor, start_date, end_date)
+        base_query = f"""
+        SELECT tz.id, z.id as zakat_id, z.nama, z.jenis_zakat, 
+               m.id as beras_id, m.nama_beras, 
+               tz.jumlah_beras, tz.total_harga, tz.tanggal
+        FROM {transaksi_source} tz
+        JOIN {zakat_source} z ON tz.id_zakat = z.id
+        JOIN master_beras m ON tz.id_beras = m.id
+        """
+        
+        conditions, params = self.build_date_filter("tz.tanggal", start_date, end_date)
+        if filter_id:
+            conditions.append("z.id = %s")
+            params.append(filter_id)
+        if conditions:
+            base_query += " WHERE " + " AND ".join(conditions)
+        
+        base_query += " ORDER BY tz.tanggal DESC, tz.id DESC"
+        return base_query, tuple(params) or None
+    
+    def view_transaksi_zakat(self, filter_id=None, start_date=None, end_date=None):
         """View all zakat distribution transactions with filtering options"""
         print("\n--- Zakat Distribution Records ---")
         
@@ -470,49 +977,40 @@ class ZakatManager:
                 return
             
             try:
+                self.start_profile("view_transaksi_zakat")
                 cursor = conn.cursor(dictionary=True)
-                
-                # Build query based on filter
-                base_query = """
-                SELECT tz.id, z.id as zakat_id, z.nama, z.jenis_zakat, 
-                       m.id as beras_id, m.nama_beras, 
-                       tz.jumlah_beras, tz.total_harga, tz.tanggal
-                FROM transaksi_zakat tz
-                JOIN zakat_data z ON tz.id_zakat = z.id
-                JOIN master_beras m ON tz.id_beras = m.id
-                """
-                
-                if filter_id:
-                    base_query += " WHERE z.id = %s"
-                    params = (filter_id,)
-                else:
-                    params = None
-                
-                base_query += " ORDER BY tz.tanggal DESC, tz.id DESC"
-                
-                cursor.execute(base_query, params)
-                results = cursor.fetchall()
+                with self.profile_phase("query"):
+                    base_query, params = self.transaksi_query(cursor, filter_id, start_date, end_date)
+                results = self.cached_query(cursor, base_query, params,
+                                            ("transaksi_zakat", "zakat_data", "master_beras"))
                 
                 if not results:
                     print("No distribution records found.")
+                    self.finish_profile(0)
                     return
                 
                 # Display table with better formatting
-                print("\n" + "-" * 120)
-                print(f"{'ID':<5}{'Zakat ID':<10}{'Donor':<20}{'Type':<15}{'Rice':<20}{'Amount':<10}{'Total':<15}{'Date':<15}")
-                print("-" * 120)
-                for row in results:
-                    print(f"{row['id']:<5}{row['zakat_id']:<10}{row['nama'][:18]:<20}"
-                          f"{row['jenis_zakat'][:14]:<15}{row['nama_beras'][:19]:<20}"
-                          f"{row['jumlah_beras']:>6.2f}kg {row['total_harga']:>12.2f} "
-                          f"{row['tanggal']}")
-                print("-" * 120)
-                print(f"Total distributions: {len(results)}")
+                columns = [
+                    ("id", "ID", None),
+                    ("zakat_id", "Zakat ID", None),
+                    ("nama", "Donor", None),
+                    ("jenis_zakat", "Type", None),
+                    ("nama_beras", "Rice", None),
+                    ("jumlah_beras", "Amount (kg)", ".2f"),
+                    ("total_harga", "Total", ".2f"),
+                    ("tanggal", "Date", None),
+                ]
+                footer = f"Total distributions: {len(results)}"
+                with self.profile_phase("write"):
+                    table = self.build_table(results, columns, footer)
+                self.finish_profile(len(results))
+                self.write_output(table)
+                self.browse_table_options(results, columns, footer)
                 
                 # Additional options
                 if not filter_id and self.confirm_action("\nWould you like to filter by zakat record ID?"):
                     filter_id = self.get_positive_int("Enter zakat record ID to filter: ")
-                    self.view_transaksi_zakat(filter_id=filter_id)
+                    self.view_transaksi_zakat(filter_id=filter_id, start_date=start_date, end_date=end_date)
                 
                 if self.confirm_action("\nWould you like to export this data to CSV?"):
                     self.export_data_to_csv(
@@ -528,9 +1026,50 @@ class ZakatManager:
         except Exception as e:
             print(f"⚠️ Unexpected error occurred: {e}")
         finally:
+            self.discard_profile()
             self.close_connection()
     
-    def view_zakat_records(self):
+    def zakat_summary_query(self, cursor, start_date=None, end_date=None, id_donatur=None):
+        """Build the zakat records + distribution summary query for an optional date range or donor"""
+        zakat_source, transaksi_source = self.table_sources(cursor, start_date, end_date)
+        
+        conditions, params = self.build_date_filter("tanggal", start_date, end_date)
+        if id_donatur:
+            conditions.append("id_donatur = %s")
+            params.append(id_donatur)
+        
+        # Distributions are pre-aggregated so the union with archive tables still groups cleanly;
+        # when filtering, only the matching donations' distributions are aggregated
+        if conditions:
+            where = "WHERE " + " AND ".join(f"z.{condition}" for condition in conditions)
+            inner_where = "WHERE " + " AND ".join(f"zz.{condition}" for condition in conditions)
+            distributions = f"""
+                SELECT tt.id_zakat, COUNT(*) as distribution_count, SUM(tt.total_harga) as total_distributed
+                FROM {transaksi_source} tt
+                JOIN {zakat_source} zz ON tt.id_zakat = zz.id
+                {inner_where}
+                GROUP BY tt.id_zakat
+            """
+            params = params * 2
+        else:
+            where = ""
+            distributions = f"""
+                SELECT id_zakat, COUNT(*) as distribution_count, SUM(total_harga) as total_distributed
+                FROM {transaksi_source} tt
+                GROUP BY id_zakat
+            """
+        
+        query = f"""
+            SELECT z.*, COALESCE(t.distribution_count, 0) as distribution_count, 
+                   COALESCE(t.total_distributed, 0) as total_distributed
+            FROM {zakat_source} z
+            LEFT JOIN ({distributions}) t ON z.id = t.id_zakat
+            {where}
+            ORDER BY z.tanggal DESC
+        """
+        return query, tuple(params) or None
+    
+    def view_zakat_records(self, start_date=None, end_date=None, id_donatur=None):
         """View all zakat records with enhanced formatting"""
         print("\n--- Zakat Records ---")
         
@@ -541,36 +1080,38 @@ class ZakatManager:
                 return
             
             try:
+                self.start_profile("view_zakat_records")
                 cursor = conn.cursor(dictionary=True)
-                cursor.execute("""
-                    SELECT z.*, COUNT(t.id) as distribution_count, 
-                           COALESCE(SUM(t.total_harga), 0) as total_distributed
-                    FROM zakat_data z
-                    LEFT JOIN transaksi_zakat t ON z.id = t.id_zakat
-                    GROUP BY z.id
-                    ORDER BY z.tanggal DESC
-                """)
-                results = cursor.fetchall()
+                with self.profile_phase("query"):
+                    query, params = self.zakat_summary_query(cursor, start_date, end_date, id_donatur)
+                results = self.cached_query(cursor, query, params, ("zakat_data", "transaksi_zakat"))
                 
                 if not results:
                     print("No zakat records found.")
+                    self.finish_profile(0)
                     return
                 
                 # Display table with better formatting
-                print("\n" + "-" * 100)
-                print(f"{'ID':<5}{'Donor':<20}{'Type':<15}{'Amount':<15}{'Date':<15}{'Distributions':<15}{'Total Distributed':<15}")
-                print("-" * 100)
-                for row in results:
-                    print(f"{row['id']:<5}{row['nama'][:18]:<20}{row['jenis_zakat'][:14]:<15}"
-                          f"{row['jumlah']:>12.2f} {row['tanggal']} "
-                          f"{row['distribution_count']:>12} {row['total_distributed']:>15.2f}")
-                print("-" * 100)
-                print(f"Total records: {len(results)}")
+                columns = [
+                    ("id", "ID", None),
+                    ("nama", "Donor", None),
+                    ("jenis_zakat", "Type", None),
+                    ("jumlah", "Amount", ".2f"),
+                    ("tanggal", "Date", None),
+                    ("distribution_count", "Distributions", None),
+                    ("total_distributed", "Total Distributed", ".2f"),
+                ]
+                footer = f"Total records: {len(results)}"
+                with self.profile_phase("write"):
+                    table = self.build_table(results, columns, footer)
+                self.finish_profile(len(results))
+                self.write_output(table)
+                self.browse_table_options(results, columns, footer)
                 
                 # Additional options
                 if self.confirm_action("\nWould you like to view distributions for a specific record?"):
                     record_id = self.get_positive_int("Enter zakat record ID: ")
-                    self.view_transaksi_zakat(filter_id=record_id)
+                    self.view_transaksi_zakat(filter_id=record_id, start_date=start_date, end_date=end_date)
                 
                 if self.confirm_action("\nWould you like to export this data to CSV?"):
                     self.export_data_to_csv(
@@ -586,6 +1127,7 @@ class ZakatManager:
         except Exception as e:
             print(f"⚠️ Unexpected error occurred: {e}")
         finally:
+            self.discard_profile()
             self.close_connection()
     
     def export_data_to_csv(self, data, filename, fields):
@@ -598,7 +1140,51 @@ class ZakatManager:
             print(f"⚠️ Failed to export data: {e}")
             print("Please ensure the file is not open in another program and you have write permissions.")
     
-    def export_to_excel(self):
+    def fetch_frame(self, cursor, query, params=None):
+        """Run a query and return the result as a DataFrame, keeping columns for empty results"""
+        with self.profile_phase("query"):
+            cursor.execute(query, params)
+        with self.profile_phase("fetch"):
+            rows = cursor.fetchall()
+        with self.profile_phase("transform"):
+            return pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+    
+    def write_excel_report(self, cursor, start_date=None, end_date=None):
+        """Write the zakat, distribution and rice sheets to a new Excel file and return its name"""
+        # Get zakat data with distribution summary
+        zakat_query, zakat_params = self.zakat_summary_query(cursor, start_date, end_date)
+        zakat_data = self.fetch_frame(cursor, zakat_query, zakat_params)
+        
+        # Get distribution data
+        zakat_source, transaksi_source = self.table_sources(cursor, start_date, end_date)
+        conditions, transaksi_params = self.build_date_filter("tz.tanggal", start_date, end_date)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        transaksi_query = f"""
+        SELECT tz.id, z.id as zakat_id, z.nama, z.jenis_zakat, 
+               m.nama_beras, tz.jumlah_beras, tz.total_harga, tz.tanggal
+        FROM {transaksi_source} tz
+        JOIN {zakat_source} z ON tz.id_zakat = z.id
+        JOIN master_beras m ON tz.id_beras = m.id
+        {where}
+        ORDER BY tz.tanggal DESC
+        """
+        transaksi_data = self.fetch_frame(cursor, transaksi_query, tuple(transaksi_params) or None)
+        
+        # Get rice types
+        beras_data = self.fetch_frame(cursor, "SELECT * FROM master_beras ORDER BY nama_beras")
+        
+        # Create Excel writer
+        filename = f"zakat_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        with self.profile_phase("write"):
+            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+                zakat_data.to_excel(writer, sheet_name="Zakat Records", index=False)
+                transaksi_data.to_excel(writer, sheet_name="Distributions", index=False)
+                beras_data.to_excel(writer, sheet_name="Rice Types", index=False)
+        if self.profile is not None:
+            self.profile["rows"] = len(zakat_data) + len(transaksi_data) + len(beras_data)
+        return filename
+    
+    def export_to_excel(self, start_date=None, end_date=None):
         """Export zakat data to Excel file with comprehensive error handling"""
         print("\n--- Export Data to Excel ---")
         
@@ -609,39 +1195,12 @@ class ZakatManager:
                 return
             
             try:
-                # Get zakat data with distribution summary
-                zakat_query = """
-                SELECT z.*, COUNT(t.id) as distribution_count, 
-                       COALESCE(SUM(t.total_harga), 0) as total_distributed
-                FROM zakat_data z
-                LEFT JOIN transaksi_zakat t ON z.id = t.id_zakat
-                GROUP BY z.id
-                ORDER BY z.tanggal DESC
-                """
-                zakat_data = pd.read_sql(zakat_query, conn)
-                
-                # Get distribution data
-                transaksi_query = """
-                SELECT tz.id, z.id as zakat_id, z.nama, z.jenis_zakat, 
-                       m.nama_beras, tz.jumlah_beras, tz.total_harga, tz.tanggal
-                FROM transaksi_zakat tz
-                JOIN zakat_data z ON tz.id_zakat = z.id
-                JOIN master_beras m ON tz.id_beras = m.id
-                ORDER BY tz.tanggal DESC
-                """
-                transaksi_data = pd.read_sql(transaksi_query, conn)
-                
-                # Get rice types
-                beras_data = pd.read_sql("SELECT * FROM master_beras ORDER BY nama_beras", conn)
-                
-                # Create Excel writer
-                filename = f"zakat_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+                cursor = conn.cursor(dictionary=True)
                 
                 try:
-                    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                        zakat_data.to_excel(writer, sheet_name="Zakat Records", index=False)
-                        transaksi_data.to_excel(writer, sheet_name="Distributions", index=False)
-                        beras_data.to_excel(writer, sheet_name="Rice Types", index=False)
+                    self.start_profile("export_to_excel")
+                    filename = self.write_excel_report(cursor, start_date, end_date)
+                    self.finish_profile(self.profile["rows"] if self.profile else 0)
                     
                     print(f"\n✅ Data successfully exported to '{filename}'")
                     print("Sheets included:")
@@ -650,6 +1209,8 @@ class ZakatManager:
                     print("- Rice Types: Master list of rice types and prices")
                 except PermissionError:
                     print("⚠️ Failed to create Excel file. Please ensure you have write permissions and the file is not open.")
+                except mysql.connector.Error:
+                    raise
                 except Exception as e:
                     print(f"⚠️ Failed to create Excel file: {e}")
             except mysql.connector.Error as err:
@@ -662,9 +1223,69 @@ class ZakatManager:
         except Exception as e:
             print(f"⚠️ Unexpected error occurred: {e}")
         finally:
+            self.discard_profile()
             self.close_connection()
     
-    def backup_database(self):
+    def sql_literal(self, val):
+        """Render a Python value as a SQL literal for backup files"""
+        if val is None:
+            return "NULL"
+        if isinstance(val, (int, float)):
+            return str(val)
+        escaped = str(val).replace("'", "''")
+        return f"'{escaped}'"
+    
+    def write_table_rows(self, f, table, rows):
+        """Write fetched rows as INSERT statements and return how many were written"""
+        if not rows:
+            return 0
+        f.write(f"-- Data for table {table}\n")
+        columns = rows[0].keys()
+        for row in rows:
+            values = [self.sql_literal(row[col]) for col in columns]
+            f.write(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)});\n")
+        f.write("\n")
+        return len(rows)
+    
+    def backup_query(self, cursor, f, table, query, params=None):
+        """Run a backup query and write its rows, timing each phase when profiling"""
+        with self.profile_phase("query"):
+            cursor.execute(query, params)
+        with self.profile_phase("fetch"):
+            rows = cursor.fetchall()
+        with self.profile_phase("write"):
+            return self.write_table_rows(f, table, rows)
+    
+    def backup_archive_partitions(self, cursor, skip_unchanged=True):
+        """Back up each archived year to its own file, skipping years unchanged since their last backup"""
+        written, skipped, rows_written = [], [], 0
+        cursor.execute("SELECT tahun, archived_at FROM archive_log ORDER BY tahun")
+        for entry in cursor.fetchall():
+            tahun = entry['tahun']
+            filename = f"zakat_backup_archive_{tahun}.sql"
+            if (skip_unchanged and os.path.exists(filename)
+                    and datetime.fromtimestamp(os.path.getmtime(filename)) >= entry['archived_at']):
+                skipped.append(tahun)
+                continue
+            
+            year_range = (f"{tahun}-01-01", f"{tahun + 1}-01-01")
+            with open(filename, 'w') as f:
+                f.write(f"-- Archived data for {tahun}\n")
+                rows_written += self.backup_query(
+                    cursor, f, "zakat_data_archive",
+                    "SELECT * FROM zakat_data_archive WHERE tanggal >= %s AND tanggal < %s",
+                    year_range
+                )
+                # Distributions are partitioned by their donation's year so each file is self-contained
+                rows_written += self.backup_query(cursor, f, "transaksi_zakat_archive", """
+                    SELECT t.* FROM transaksi_zakat_archive t
+                    JOIN zakat_data_archive z ON t.id_zakat = z.id
+                    WHERE z.tanggal >= %s AND z.tanggal < %s
+                """, year_range)
+            written.append(tahun)
+        return written, skipped, rows_written
+    
+    def backup_database(self, skip_unchanged_archive=None):
         """Create a database backup with error handling"""
         print("\n--- Database Backup ---")
         if not self.confirm_action("This will create a backup of all data. Continue?"):
@@ -684,36 +1305,41 @@ class ZakatManager:
                 cursor = conn.cursor(dictionary=True)
                 cursor.execute("SHOW TABLES")
                 tables = [table['Tables_in_zakat'] for table in cursor.fetchall()]
+                archive_tables = ("zakat_data_archive", "transaksi_zakat_archive")
+                if "archive_log" in tables and skip_unchanged_archive is None:
+                    skip_unchanged_archive = self.confirm_action(
+                        "Skip archived years that are unchanged since their last backup?"
+                    )
                 
+                self.start_profile("backup_database")
+                rows_written = 0
                 with open(filename, 'w') as f:
                     for table in tables:
                         # Write table structure
-                        cursor.execute(f"SHOW CREATE TABLE {table}")
-                        create_table = cursor.fetchone()['Create Table']
+                        with self.profile_phase("query"):
+                            cursor.execute(f"SHOW CREATE TABLE {table}")
+                            create_table = cursor.fetchone()['Create Table']
                         f.write(f"\n-- Structure for table {table}\n")
                         f.write(f"{create_table};\n\n")
                         
+                        # Archived rows are written per year below
+                        if table in archive_tables:
+                            continue
+                        
                         # Write table data
-                        cursor.execute(f"SELECT * FROM {table}")
-                        rows = cursor.fetchall()
-                        if rows:
-                            f.write(f"-- Data for table {table}\n")
-                            columns = rows[0].keys()
-                            for row in rows:
-                                values = []
-                                for col in columns:
-                                    val = row[col]
-                                    if val is None:
-                                        values.append("NULL")
-                                    elif isinstance(val, (int, float)):
-                                        values.append(str(val))
-                                    else:
-                                        values.append(f"'{str(val).replace("'", "''")}'")
-                                f.write(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)});\n")
-                            f.write("\n")
+                        rows_written += self.backup_query(cursor, f, table, f"SELECT * FROM {table}")
                 
                 print(f"\n✅ Database backup created successfully: {filename}")
                 print(f"Backup includes {len(tables)} tables: {', '.join(tables)}")
+                
+                if "archive_log" in tables:
+                    written, skipped, archive_rows = self.backup_archive_partitions(cursor, skip_unchanged_archive)
+                    rows_written += archive_rows
+                    if written:
+                        print(f"Archived years written: {', '.join(map(str, written))}")
+                    if skipped:
+                        print(f"Archived years unchanged (skipped): {', '.join(map(str, skipped))}")
+                self.finish_profile(rows_written)
             except mysql.connector.Error as err:
                 print(f"⚠️ Failed to create backup: {err}")
             except IOError as e:
@@ -725,6 +1351,606 @@ class ZakatManager:
                     cursor.close()
         except Exception as e:
             print(f"⚠️ Unexpected error occurred: {e}")
+        finally:
+            self.discard_profile()
+            self.close_connection()
+    
+    def ensure_archive_tables(self, cursor):
+        """Create the archive tables and archive log if they don't exist yet"""
+        cursor.execute("CREATE TABLE IF NOT EXISTS zakat_data_archive LIKE zakat_data")
+        cursor.execute("CREATE TABLE IF NOT EXISTS transaksi_zakat_archive LIKE transaksi_zakat")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archive_log (
+                tahun INT PRIMARY KEY,
+                zakat_rows INT NOT NULL DEFAULT 0,
+                transaksi_rows INT NOT NULL DEFAULT 0,
+                archived_at DATETIME NOT NULL
+            )
+        """)
+    
+    def archive_closed_years(self, through_year=None, interactive=True):
+        """Move donations of closed years, together with their distributions, into the archive tables"""
+        print("\n--- Archive Closed Years ---")
+        current_year = datetime.now().year
+        
+        try:
+            if through_year is None:
+                through_year = self.get_positive_int(
+                    f"Archive all years up to and including (max {current_year - 1}): ",
+                    max_value=current_year - 1
+                )
+            if through_year >= current_year:
+                print(f"⚠️ Only closed years (before {current_year}) can be archived.")
+                return
+            if interactive and not self.confirm_action(
+                    f"Move all donations up to {through_year} and their distributions to the archive?"):
+                print("Archiving cancelled.")
+                return
+            
+            conn = self.create_connection()
+            if not conn:
+                print("⚠️ Cannot proceed without database connection.")
+                return
+            
+            try:
+                cursor = conn.cursor(dictionary=True)
+                self.ensure_archive_tables(cursor)
+                cutoff = f"{through_year + 1}-01-01"
+                last_id = 0
+                total_zakat = total_transaksi = 0
+                
+                while True:
+                    # A donation only moves when all of its distributions are closed too,
+                    # so no hot distribution ever points at an archived donation
+                    cursor.execute("""
+                        SELECT z.id, YEAR(z.tanggal) AS tahun FROM zakat_data z
+                        WHERE z.id > %s AND z.tanggal < %s
+                          AND NOT EXISTS (
+                              SELECT 1 FROM transaksi_zakat t
+                              WHERE t.id_zakat = z.id AND t.tanggal >= %s
+                          )
+                        ORDER BY z.id
+                        LIMIT %s
+                    """, (last_id, cutoff, cutoff, self.ARCHIVE_BATCH_SIZE))
+                    batch = cursor.fetchall()
+                    if not batch:
+                        break
+                    
+                    ids = [row['id'] for row in batch]
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    per_year = {}
+                    for row in batch:
+                        per_year.setdefault(row['tahun'], [0, 0])[0] += 1
+                    cursor.execute(f"""
+                        SELECT YEAR(z.tanggal) AS tahun, COUNT(*) AS jumlah
+                        FROM transaksi_zakat t JOIN zakat_data z ON t.id_zakat = z.id
+                        WHERE z.id IN ({placeholders})
+                        GROUP BY YEAR(z.tanggal)
+                    """, ids)
+                    for row in cursor.fetchall():
+                        per_year[row['tahun']][1] += row['jumlah']
+                    
+                    try:
+                        cursor.execute(f"INSERT INTO zakat_data_archive SELECT * FROM zakat_data WHERE id IN ({placeholders})", ids)
+                        cursor.execute(f"INSERT INTO transaksi_zakat_archive SELECT * FROM transaksi_zakat WHERE id_zakat IN ({placeholders})", ids)
+                        cursor.execute(f"DELETE FROM transaksi_zakat WHERE id_zakat IN ({placeholders})", ids)
+                        transaksi_moved = cursor.rowcount
+                        cursor.execute(f"DELETE FROM zakat_data WHERE id IN ({placeholders})", ids)
+                        for tahun, (zakat_rows, transaksi_rows) in per_year.items():
+                            cursor.execute("""
+                                INSERT INTO archive_log (tahun, zakat_rows, transaksi_rows, archived_at)
+                                VALUES (%s, %s, %s, NOW())
+                                ON DUPLICATE KEY UPDATE zakat_rows = zakat_rows + VALUES(zakat_rows),
+                                    transaksi_rows = transaksi_rows + VALUES(transaksi_rows),
+                                    archived_at = NOW()
+                            """, (tahun, zakat_rows, transaksi_rows))
+                        conn.commit()
+                        self.invalidate_cache("zakat_data", "transaksi_zakat")
+                    except mysql.connector.Error:
+                        conn.rollback()
+                        raise
+                    
+                    last_id = ids[-1]
+                    total_zakat += len(ids)
+                    total_transaksi += transaksi_moved
+                    print(f"  Archived {total_zakat} donations, {total_transaksi} distributions...")
+                
+                # Donations with distributions in the open year have to stay hot
+                cursor.execute("SELECT COUNT(*) AS jumlah FROM zakat_data WHERE tanggal < %s", (cutoff,))
+                kept = cursor.fetchone()['jumlah']
+                
+                print(f"\n✅ Archiving complete: {total_zakat} donations and {total_transaksi} distributions moved.")
+                if kept:
+                    print(f"{kept} donation(s) up to {through_year} kept active because they have distributions after {through_year}.")
+            except mysql.connector.Error as err:
+                print(f"⚠️ Failed to archive records: {err}")
+            finally:
+                if 'cursor' in locals():
+                    cursor.close()
+        except Exception as e:
+            print(f"⚠️ Unexpected error occurred: {e}")
+        finally:
+            self.close_connection()
+    
+    def ensure_donor_tables(self, cursor):
+        """Create the donor registry and its trigram index if they don't exist yet"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS donatur (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                nama VARCHAR(255) NOT NULL,
+                nama_normal VARCHAR(255) NOT NULL,
+                jumlah_trigram INT NOT NULL DEFAULT 0,
+                UNIQUE KEY uq_donatur_nama_normal (nama_normal)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS donatur_trigram (
+                trigram VARCHAR(3) NOT NULL,
+                id_donatur INT NOT NULL,
+                PRIMARY KEY (trigram, id_donatur),
+                KEY idx_donatur_trigram_donatur (id_donatur)
+            )
+        """)
+    
+    def ensure_donor_column(self, cursor, table):
+        """Add the indexed id_donatur column to a zakat table if it is missing.
+        Returns True if the column was added."""
+        cursor.execute("""
+            SELECT COUNT(*) AS jumlah FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = 'id_donatur'
+        """, (table,))
+        if cursor.fetchone()['jumlah'] > 0:
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN id_donatur INT NULL, ADD INDEX idx_{table}_donatur (id_donatur)")
+        return True
+    
+    def migrate_donor_registry(self):
+        """Build the donor registry from existing names and link every zakat record to its donor"""
+        print("\n--- Migrate Donor Registry ---")
+        
+        try:
+            conn = self.create_connection()
+            if not conn:
+                print("⚠️ Cannot proceed without database connection.")
+                return
+            
+            try:
+                cursor = conn.cursor(dictionary=True)
+                self.ensure_donor_tables(cursor)
+                tables = ["zakat_data"]
+                if self.table_exists(cursor, "zakat_data_archive"):
+                    tables.append("zakat_data_archive")
+                added_columns = [table for table in tables if self.ensure_donor_column(cursor, table)]
+                
+                # Collect every unlinked spelling once
+                names = set()
+                for table in tables:
+                    cursor.execute(f"SELECT DISTINCT nama FROM {table} WHERE id_donatur IS NULL")
+                    names.update(row['nama'] for row in cursor.fetchall())
+                
+                cursor.execute("SELECT nama_normal FROM donatur")
+                known = {row['nama_normal'] for row in cursor.fetchall()}
+                
+                # Spellings that normalize to the same name become one donor
+                new_donors = {}
+                for nama in sorted(names):
+                    nama_normal = self.normalize_name(nama)
+                    if nama_normal and nama_normal not in known:
+                        new_donors.setdefault(nama_normal, nama)
+                
+                donor_rows = [
+                    (nama, nama_normal, len(self.name_trigrams(nama_normal)))
+                    for nama_normal, nama in new_donors.items()
+                ]
+                for i in range(0, len(donor_rows), self.MIGRATION_BATCH_SIZE):
+                    cursor.executemany(
+                        "INSERT INTO donatur (nama, nama_normal, jumlah_trigram) VALUES (%s, %s, %s)",
+                        donor_rows[i:i + self.MIGRATION_BATCH_SIZE]
+                    )
+                
+                cursor.execute("SELECT id, nama_normal FROM donatur")
+                donor_ids = {row['nama_normal']: row['id'] for row in cursor.fetchall()}
+                
+                trigram_rows = [
+                    (trigram, donor_ids[nama_normal])
+                    for nama_normal in new_donors
+                    for trigram in self.name_trigrams(nama_normal)
+                ]
+                for i in range(0, len(trigram_rows), self.MIGRATION_BATCH_SIZE):
+                    cursor.executemany(
+                        "INSERT IGNORE INTO donatur_trigram (trigram, id_donatur) VALUES (%s, %s)",
+                        trigram_rows[i:i + self.MIGRATION_BATCH_SIZE]
+                    )
+                
+                # Link records with one set-based UPDATE per table through a name -> donor map
+                cursor.execute("""
+                    CREATE TEMPORARY TABLE donatur_map (
+                        nama VARCHAR(255) PRIMARY KEY,
+                        id_donatur INT NOT NULL
+                    )
+                """)
+                map_rows = [
+                    (nama, donor_ids[self.normalize_name(nama)])
+                    for nama in names if self.normalize_name(nama) in donor_ids
+                ]
+                for i in range(0, len(map_rows), self.MIGRATION_BATCH_SIZE):
+                    cursor.executemany(
+                        "INSERT IGNORE INTO donatur_map (nama, id_donatur) VALUES (%s, %s)",
+                        map_rows[i:i + self.MIGRATION_BATCH_SIZE]
+                    )
+                # Archived years whose rows change must be dumped again by the next backup
+                if "zakat_data_archive" in added_columns:
+                    cursor.execute("UPDATE archive_log SET archived_at = NOW()")
+                elif "zakat_data_archive" in tables:
+                    cursor.execute("""
+                        UPDATE archive_log SET archived_at = NOW()
+                        WHERE tahun IN (
+                            SELECT DISTINCT YEAR(z.tanggal)
+                            FROM zakat_data_archive z JOIN donatur_map m ON z.nama = m.nama
+                            WHERE z.id_donatur IS NULL
+                        )
+                    """)
+                linked = 0
+                for table in tables:
+                    cursor.execute(f"""
+                        UPDATE {table} z JOIN donatur_map m ON z.nama = m.nama
+                        SET z.id_donatur = m.id_donatur
+                        WHERE z.id_donatur IS NULL
+                    """)
+                    linked += cursor.rowcount
+                cursor.execute("DROP TEMPORARY TABLE donatur_map")
+                conn.commit()
+                self.invalidate_cache("zakat_data")
+                
+                print(f"\n✅ Donor registry migrated: {len(names)} distinct name(s) merged into "
+                      f"{len(new_donors)} new donor(s), {linked} record(s) linked.")
+            except mysql.connector.Error as err:
+                conn.rollback()
+                print(f"⚠️ Failed to migrate donor registry: {err}")
+            finally:
+                if 'cursor' in locals():
+                    cursor.close()
+        except Exception as e:
+            print(f"⚠️ Unexpected error occurred: {e}")
+        finally:
+            self.close_connection()
+    
+    def setup_change_counters(self):
+        """Install the trigger-maintained table_versions counters that the listing cache checks"""
+        print("\n--- Set Up Listing Cache ---")
+        
+        try:
+            conn = self.create_connection()
+            if not conn:
+                print("⚠️ Cannot proceed without database connection.")
+                return
+            
+            try:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS table_versions (
+                        nama_tabel VARCHAR(64) PRIMARY KEY,
+                        versi BIGINT NOT NULL DEFAULT 0
+                    )
+                """)
+                placeholders = ", ".join(["(%s)"] * len(self.VERSIONED_TABLES))
+                cursor.execute(f"INSERT IGNORE INTO table_versions (nama_tabel) VALUES {placeholders}",
+                               self.VERSIONED_TABLES)
+                for table in self.VERSIONED_TABLES:
+                    for event in ("INSERT", "UPDATE", "DELETE"):
+                        cursor.execute(f"""
+                            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_versi
+                            AFTER {event} ON {table} FOR EACH ROW
+                            UPDATE table_versions SET versi = versi + 1 WHERE nama_tabel = '{table}'
+                        """)
+                conn.commit()
+                self.change_counters_ready = None
+                print(f"\n✅ Change counters installed for {', '.join(self.VERSIONED_TABLES)}. "
+                      f"Listings will now reuse unchanged results within a session.")
+            except mysql.connector.Error as err:
+                conn.rollback()
+                print(f"⚠️ Failed to set up change counters: {err}")
+                if err.errno in (1142, 1419):  # Missing TRIGGER / SUPER privilege
+                    print("Additional info: creating triggers needs the TRIGGER privilege.")
+            finally:
+                if 'cursor' in locals():
+                    cursor.close()
+        except Exception as e:
+            print(f"⚠️ Unexpected error occurred: {e}")
+        finally:
+            self.close_connection()
+    
+    def search_donor_records(self):
+        """Search the donor registry by name and show the chosen donor's zakat records"""
+        print("\n--- Search Donors ---")
+        
+        try:
+            nama = self.get_non_empty_input("Enter donor name to search: ", "Donor name")
+            
+            conn = self.create_connection()
+            if not conn:
+                print("⚠️ Cannot proceed without database connection.")
+                return
+            
+            try:
+                cursor = conn.cursor(dictionary=True)
+                if not self.normalize_name(nama):
+                    print(f"No donors found matching '{nama}'.")
+                    return
+                matches = self.search_donors(cursor, nama, limit=10)
+                if matches is None:
+                    print("⚠️ The donor registry has not been set up yet. Run the donor migration first.")
+                    return
+                if not matches:
+                    print(f"No donors found matching '{nama}'.")
+                    return
+                
+                print("\n" + "-" * 60)
+                print(f"{'No':<5}{'Donor ID':<10}{'Name':<35}{'Match':>10}")
+                print("-" * 60)
+                for i, donor in enumerate(matches, start=1):
+                    print(f"{i:<5}{donor['id']:<10}{donor['nama'][:34]:<35}{float(donor['similarity']):>10.0%}")
+                print("-" * 60)
+                
+                choice = self.get_positive_int(f"Select donor (1-{len(matches)}): ", max_value=len(matches))
+                id_donatur = matches[choice - 1]['id']
+            except mysql.connector.Error as err:
+                print(f"⚠️ Failed to search donors: {err}")
+                return
+            finally:
+                if 'cursor' in locals():
+                    cursor.close()
+                self.close_connection()
+            
+            self.view_zakat_records(*self.get_date_range(), id_donatur=id_donatur)
+        except Exception as e:
+            print(f"⚠️ Unexpected error occurred: {e}")
+        finally:
+            self.close_connection()
+    
+    def generate_donor_statements(self, year=None, fmt=None, workers=None, resume=None):
+        """Write one statement file per donor for a year, rendering files in parallel worker processes"""
+        print("\n--- Generate Donor Statements ---")
+        
+        try:
+            current_year = datetime.now().year
+            if year is None:
+                year = self.get_positive_int(f"Enter statement year (max {current_year}): ", max_value=current_year)
+            while fmt not in ("csv", "xlsx"):
+                fmt = input("Enter file format (csv/xlsx): ").strip().lower()
+            
+            output_dir = f"statements_{year}"
+            os.makedirs(output_dir, exist_ok=True)
+            done = {name for name in os.listdir(output_dir)
+                    if name.endswith(f".{fmt}") and not name.endswith(f".tmp.{fmt}")}
+            if done and resume is None:
+                resume = self.confirm_action(f"{len(done)} statement(s) already exist in '{output_dir}'. Resume and skip them?")
+            if not resume:
+                done = set()
+            
+            conn = self.create_connection()
+            if not conn:
+                print("⚠️ Cannot proceed without database connection.")
+                return
+            
+            try:
+                cursor = conn.cursor(dictionary=True)
+                start_date, end_date = f"{year}-01-01", f"{year}-12-31"
+                zakat_source, transaksi_source = self.table_sources(cursor, start_date, end_date)
+                
+                # Two set-based queries for the whole year instead of one query per donor
+                cursor.execute(f"""
+                    SELECT z.id, z.nama, z.id_donatur, d.nama AS nama_donatur, d.nama_normal,
+                           z.jenis_zakat, z.jumlah, z.tanggal
+                    FROM {zakat_source} z
+                    LEFT JOIN donatur d ON d.id = z.id_donatur
+                    WHERE z.tanggal >= %s AND z.tanggal <= %s
+                    ORDER BY z.id_donatur, z.tanggal, z.id
+                """, (start_date, end_date))
+                donations = cursor.fetchall()
+                cursor.execute(f"""
+                    SELECT tz.id, tz.id_zakat, m.nama_beras, tz.jumlah_beras, tz.total_harga, tz.tanggal
+                    FROM {transaksi_source} tz
+                    JOIN {zakat_source} z ON tz.id_zakat = z.id
+                    JOIN master_beras m ON tz.id_beras = m.id
+                    WHERE z.tanggal >= %s AND z.tanggal <= %s
+                    ORDER BY tz.id_zakat, tz.tanggal, tz.id
+                """, (start_date, end_date))
+                distributions = cursor.fetchall()
+            except mysql.connector.Error as err:
+                if err.errno == 1146 or err.errno == 1054:  # Registry table or column missing
+                    print("⚠️ The donor registry has not been set up yet. Run the donor migration first.")
+                else:
+                    print(f"⚠️ Failed to retrieve statement data: {err}")
+                return
+            finally:
+                if 'cursor' in locals():
+                    cursor.close()
+                self.close_connection()
+            
+            # Unlinked donations the migration can register would leave a donor's statement incomplete;
+            # names that normalize to nothing (e.g. "-") are never registered and are only reported
+            unlinked = [row for row in donations if row['nama_donatur'] is None]
+            unregistrable = [row['id'] for row in unlinked if not self.normalize_name(row['nama'])]
+            if len(unlinked) > len(unregistrable):
+                example = next(row['id'] for row in unlinked if self.normalize_name(row['nama']))
+                print(f"⚠️ {len(unlinked) - len(unregistrable)} donation(s) in {year} are not linked to a donor "
+                      f"(e.g. zakat record {example}). Run the donor migration first.")
+                return
+            if unregistrable:
+                print(f"ℹ️ {len(unregistrable)} donation(s) in {year} have no registrable donor name and get no "
+                      f"statement (zakat record(s) {', '.join(str(id_zakat) for id_zakat in unregistrable[:10])}"
+                      f"{', ...' if len(unregistrable) > 10 else ''}).")
+                donations = [row for row in donations if row['nama_donatur'] is not None]
+            
+            # Group in memory: donor -> donations, donation -> distributions
+            statements = {}
+            donor_of = {}
+            for row in donations:
+                statement = statements.setdefault(row['id_donatur'], {
+                    'nama': row['nama_donatur'],
+                    'filename': f"{row['id_donatur']}_{row['nama_normal'].replace(' ', '_')}.{fmt}",
+                    'donations': [],
+                    'distributions': [],
+                })
+                statement['donations'].append({
+                    key: row[key] for key in ("id", "jenis_zakat", "jumlah", "tanggal")
+                })
+                donor_of[row['id']] = row['id_donatur']
+            for row in distributions:
+                if row['id_zakat'] in donor_of:
+                    statements[donor_of[row['id_zakat']]]['distributions'].append(row)
+            
+            jobs = [
+                (os.path.join(output_dir, statement['filename']), fmt, statement['nama'],
+                 statement['donations'], statement['distributions'])
+                for statement in statements.values()
+                if statement['filename'] not in done
+            ]
+            skipped = len(statements) - len(jobs)
+            if not jobs:
+                print(f"No statements to generate for {year} ({skipped} already done).")
+                return
+            
+            print(f"Generating {len(jobs)} statement(s) for {year} into '{output_dir}'"
+                  + (f" ({skipped} already done)" if skipped else "") + "...")
+            started = time.perf_counter()
+            written = 0
+            missing = []
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for path in executor.map(write_donor_statement, jobs, chunksize=self.STATEMENT_CHUNK_SIZE):
+                    if not os.path.isfile(path):
+                        missing.append(path)
+                    written += 1
+                    if written % self.STATEMENT_CHUNK_SIZE == 0 or written == len(jobs):
+                        elapsed = time.perf_counter() - started
+                        print(f"  {written}/{len(jobs)} statements "
+                              f"({written / elapsed if elapsed else 0:.1f}/s)")
+            
+            elapsed = time.perf_counter() - started
+            if missing:
+                print(f"\n⚠️ {len(missing)} statement file(s) were not created (e.g. '{missing[0]}'). "
+                      f"Run again to resume.")
+                return
+            print(f"\n✅ {written} donor statement(s) written to '{output_dir}' in {elapsed:.1f}s.")
+        except OSError as e:
+            print(f"⚠️ File error while writing statements: {e}")
+            print("Statements already written are kept; run again to resume.")
+        except Exception as e:
+            print(f"⚠️ Unexpected error occurred: {e}")
+        finally:
+            self.close_connection()
+    
+    def integrity_jobs(self, cursor, chunk_size):
+        """Split the hot and archive tables into id ranges, one scan task per range.
+        Returns the jobs and the number of tables that have rows to scan."""
+        pairs = [("transaksi_zakat", "zakat_data")]
+        if self.table_exists(cursor, "transaksi_zakat_archive"):
+            pairs.append(("transaksi_zakat_archive", "zakat_data_archive"))
+        
+        jobs = []
+        non_empty = 0
+        for transaksi_table, zakat_table in pairs:
+            # Distribution checks walk the distribution ids, over-distribution walks the donation ids
+            for check, table in (("distributions", transaksi_table), ("over_distribution", zakat_table)):
+                cursor.execute(f"SELECT MIN(id) AS lo, MAX(id) AS hi FROM {table}")
+                bounds = cursor.fetchone()
+                if bounds['lo'] is None:
+                    continue
+                non_empty += 1
+                for lo in range(bounds['lo'], bounds['hi'] + 1, chunk_size):
+                    jobs.append((check, transaksi_table, zakat_table, lo, lo + chunk_size - 1,
+                                 self.INTEGRITY_TOLERANCE))
+        return jobs, non_empty
+    
+    def verify_integrity(self, workers=None, chunk_size=None, report_file=None):
+        """Scan distributions and donations for integrity violations in parallel id ranges.
+        Returns INTEGRITY_OK, INTEGRITY_VIOLATIONS or INTEGRITY_ERROR for use as an exit status."""
+        print("\n--- Verify Data Integrity ---")
+        if chunk_size is None:
+            chunk_size = self.INTEGRITY_CHUNK_SIZE
+        if chunk_size < 1:
+            print(f"⚠️ Chunk size must be at least 1 (got {chunk_size}).")
+            return self.INTEGRITY_ERROR
+        report_file = report_file or f"integrity_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        
+        try:
+            conn = self.create_connection()
+            if not conn:
+                print("⚠️ Cannot proceed without database connection.")
+                return self.INTEGRITY_ERROR
+            
+            try:
+                cursor = conn.cursor(dictionary=True)
+                jobs, non_empty = self.integrity_jobs(cursor, chunk_size)
+            except mysql.connector.Error as err:
+                print(f"⚠️ Failed to plan integrity scan: {err}")
+                return self.INTEGRITY_ERROR
+            finally:
+                if 'cursor' in locals():
+                    cursor.close()
+                self.close_connection()
+            
+            if non_empty and not jobs:
+                print(f"⚠️ No id ranges were planned although {non_empty} table(s) have rows; nothing was checked.")
+                return self.INTEGRITY_ERROR
+            print(f"Scanning {len(jobs)} id range(s) of up to {chunk_size} rows...")
+            started = time.perf_counter()
+            violations, warnings = [], []
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_integrity_worker,
+                                     initargs=(self.db_config,)) as executor:
+                for done, found in enumerate(executor.map(scan_integrity_range, jobs), start=1):
+                    for finding in found:
+                        if finding['check'] in self.INTEGRITY_WARNING_CHECKS:
+                            warnings.append(finding)
+                        else:
+                            violations.append(finding)
+                    if done % 10 == 0 or done == len(jobs):
+                        print(f"  {done}/{len(jobs)} ranges checked, {len(violations)} violation(s) "
+                              f"and {len(warnings)} warning(s) so far")
+            elapsed = time.perf_counter() - started
+            
+            summary, warning_summary = {}, {}
+            for findings, counts in ((violations, summary), (warnings, warning_summary)):
+                for finding in findings:
+                    counts[finding['check']] = counts.get(finding['check'], 0) + 1
+            report = {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "seconds": round(elapsed, 3),
+                "ranges": len(jobs),
+                "violation_count": len(violations),
+                "summary": summary,
+                "violations": violations,
+                "warning_count": len(warnings),
+                "warning_summary": warning_summary,
+                "warnings": warnings,
+                "notes": [self.INTEGRITY_PRICE_NOTE],
+            }
+            with open(report_file, "w") as f:
+                json.dump(report, f, indent=2, default=str)
+            
+            if warnings:
+                print(f"\nℹ️ {len(warnings)} warning(s):")
+                for check, count in sorted(warning_summary.items()):
+                    print(f"- {check}: {count}")
+                print(f"Note: {self.INTEGRITY_PRICE_NOTE}.")
+            if violations:
+                print(f"\n⚠️ {len(violations)} integrity violation(s) found in {elapsed:.1f}s:")
+                for check, count in sorted(summary.items()):
+                    print(f"- {check}: {count}")
+                print(f"Details written to '{report_file}'")
+                return self.INTEGRITY_VIOLATIONS
+            print(f"\n✅ No integrity violations found ({len(jobs)} ranges in {elapsed:.1f}s). Report: '{report_file}'")
+            return self.INTEGRITY_OK
+        except mysql.connector.Error as err:
+            print(f"⚠️ Integrity scan failed: {err}")
+            return self.INTEGRITY_ERROR
+        except IOError as e:
+            print(f"⚠️ File error while writing integrity report: {e}")
+            return self.INTEGRITY_ERROR
+        except Exception as e:
+            print(f"⚠️ Unexpected error occurred: {e}")
+            return self.INTEGRITY_ERROR
         finally:
             self.close_connection()
     
@@ -736,20 +1962,30 @@ class ZakatManager:
         print("1. Add Zakat Record - Record new zakat donations")
         print("2. Update Zakat Record - Modify existing donation records")
         print("3. Delete Zakat Record - Remove donation records (with caution)")
-        print("4. View Rice Types - See available rice types and prices")
-        print("5. Add Rice Type - Add new rice types for distribution")
-        print("6. Add Distribution Record - Record zakat distributions to recipients")
-        print("7. View Distribution Records - See all distribution history")
-        print("8. Export Data - Export all data to Excel for reporting")
-        print("9. Database Backup - Create a complete database backup")
-        print("10. Help - Display this help information")
-        print("11. Exit - Quit the application")
+        print("4. View Zakat Records - See donations with their distribution totals")
+        print("5. View Rice Types - See available rice types and prices")
+        print("6. Add Rice Type - Add new rice types for distribution")
+        print("7. Add Distribution Record - Record zakat distributions to recipients")
+        print("8. View Distribution Records - See all distribution history")
+        print("9. Export Data - Export all data to Excel for reporting")
+        print("10. Database Backup - Create a complete database backup")
+        print("11. Archive Closed Years - Move old years into archive tables")
+        print("12. Search Donors - Find a donor by name (typos allowed) and see their records")
+        print("13. Migrate Donor Registry - Build the donor list from existing records")
+        print("14. Generate Donor Statements - Year-end statement file for every donor")
+        print("15. Toggle Profiling Mode - Record time and memory of exports, backups and listings")
+        print("16. Verify Data Integrity - Check references and over-distribution; totals that differ from")
+        print("    today's rice price are warnings, since an earlier price may have applied")
+        print("17. Help - Display this help information")
+        print("18. Exit - Quit the application")
         
         print("\nTips:")
         print("- Required fields are marked and cannot be left empty")
         print("- Dates must be in YYYY-MM-DD format")
         print("- Amounts must be positive numbers")
         print("- Always confirm important actions like deletions")
+        print("- Archived years only appear in listings and exports when a date range reaches them")
+        print("- Listings reuse unchanged results after a one-time 'setup-cache' run from the command line")
         
         input("\nPress Enter to return to the main menu...")
     
@@ -770,10 +2006,16 @@ class ZakatManager:
                 print("8. View Distribution Records")
                 print("9. Export Data to Excel")
                 print("10. Database Backup")
-                print("11. Help")
-                print("12. Exit")
+                print("11. Archive Closed Years")
+                print("12. Search Donors")
+                print("13. Migrate Donor Registry")
+                print("14. Generate Donor Statements")
+                print(f"15. Toggle Profiling Mode ({'ON' if self.profiling else 'OFF'})")
+                print("16. Verify Data Integrity")
+                print("17. Help")
+                print("18. Exit")
                 
-                choice = input("\nEnter your choice (1-12): ").strip()
+                choice = input("\nEnter your choice (1-18): ").strip()
                 
                 if choice == "1":
                     self.add_zakat()
@@ -782,7 +2024,7 @@ class ZakatManager:
                 elif choice == "3":
                     self.delete_zakat()
                 elif choice == "4":
-                    self.view_zakat_records()
+                    self.view_zakat_records(*self.get_date_range())
                 elif choice == "5":
                     self.view_master_beras()
                 elif choice == "6":
@@ -790,23 +2032,36 @@ class ZakatManager:
                 elif choice == "7":
                     self.add_transaksi_zakat()
                 elif choice == "8":
-                    self.view_transaksi_zakat()
+                    start_date, end_date = self.get_date_range()
+                    self.view_transaksi_zakat(start_date=start_date, end_date=end_date)
                 elif choice == "9":
-                    self.export_to_excel()
+                    self.export_to_excel(*self.get_date_range())
                 elif choice == "10":
                     self.backup_database()
                 elif choice == "11":
-                    self.display_help()
+                    self.archive_closed_years()
                 elif choice == "12":
+                    self.search_donor_records()
+                elif choice == "13":
+                    self.migrate_donor_registry()
+                elif choice == "14":
+                    self.generate_donor_statements()
+                elif choice == "15":
+                    self.toggle_profiling()
+                elif choice == "16":
+                    self.verify_integrity()
+                elif choice == "17":
+                    self.display_help()
+                elif choice == "18":
                     if self.confirm_action("Are you sure you want to exit?"):
                         print("\nThank you for using Zakat Management System. Goodbye!")
                         self.close_connection()
                         sys.exit(0)
                 else:
-                    print("⚠️ Invalid choice. Please enter a number between 1-12.")
+                    print("⚠️ Invalid choice. Please enter a number between 1-18.")
                 
                 # Pause before returning to menu
-                if choice not in ("11", "12"):
+                if choice not in ("17", "18"):
                     input("\nPress Enter to return to the main menu...")
             except KeyboardInterrupt:
                 print("\n\n⚠️ Operation cancelled by user.")
@@ -820,11 +2075,742 @@ class ZakatManager:
                 self.close_connection()
                 input("Press Enter to continue...")
 
+def write_donor_statement(job):
+    """Render one donor statement file; runs in a worker process"""
+    path, fmt, nama, donations, distributions = job
+    donations_df = pd.DataFrame(donations, columns=["id", "jenis_zakat", "jumlah", "tanggal"])
+    distributions_df = pd.DataFrame(
+        distributions,
+        columns=["id", "id_zakat", "nama_beras", "jumlah_beras", "total_harga", "tanggal"]
+    )
+    
+    # Write to a temporary name first so an interrupted run never leaves a file that looks finished;
+    # the real extension stays last because ExcelWriter picks its format from it
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    if fmt == "xlsx":
+        with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+            pd.DataFrame([{"Donor": nama}]).to_excel(writer, sheet_name="Donor", index=False)
+            donations_df.to_excel(writer, sheet_name="Donations", index=False)
+            distributions_df.to_excel(writer, sheet_name="Distributions", index=False)
+    else:
+        # One row per donation and distribution pair; donations without distributions are kept
+        statement = donations_df.rename(columns={"id": "zakat_id", "tanggal": "tanggal_zakat"}).merge(
+            distributions_df.rename(columns={"id": "distribusi_id", "tanggal": "tanggal_distribusi"}),
+            how="left", left_on="zakat_id", right_on="id_zakat"
+        ).drop(columns="id_zakat")
+        statement.insert(0, "nama", nama)
+        statement.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+# Connection used by integrity scan worker processes, opened once per process
+integrity_connection = None
+
+def init_integrity_worker(db_config):
+    """Open the database connection for one integrity scan worker process"""
+    global integrity_connection
+    integrity_connection = mysql.connector.connect(**db_config, connection_timeout=5)
+
+def scan_integrity_range(job):
+    """Check one id range with set-based SQL and vectorized comparisons; runs in a worker process"""
+    check, transaksi_table, zakat_table, lo, hi, tolerance = job
+    violations = []
+    cursor = integrity_connection.cursor(dictionary=True)
+    try:
+        if check == "distributions":
+            columns = ["id", "id_zakat", "id_beras", "jumlah_beras", "total_harga",
+                       "zakat_found", "beras_found", "harga_per_kg"]
+            cursor.execute(f"""
+                SELECT t.id, t.id_zakat, t.id_beras, t.jumlah_beras, t.total_harga,
+                       z.id AS zakat_found, m.id AS beras_found, m.harga_per_kg
+                FROM {transaksi_table} t
+                LEFT JOIN {zakat_table} z ON z.id = t.id_zakat
+                LEFT JOIN master_beras m ON m.id = t.id_beras
+                WHERE t.id BETWEEN %s AND %s
+            """, (lo, hi))
+            df = pd.DataFrame(cursor.fetchall(), columns=columns)
+            
+            for row in df[df["zakat_found"].isna()].itertuples():
+                violations.append({"check": "missing_donation", "table": transaksi_table, "id": row.id,
+                                   "detail": f"references missing zakat record {row.id_zakat}"})
+            for row in df[df["beras_found"].isna()].itertuples():
+                violations.append({"check": "missing_rice_type", "table": transaksi_table, "id": row.id,
+                                   "detail": f"references missing rice type {row.id_beras}"})
+            
+            priced = df[df["beras_found"].notna()]
+            # Compared unrounded so half-cent rounding of the stored total never counts as a mismatch
+            expected = priced["jumlah_beras"].astype(float) * priced["harga_per_kg"].astype(float)
+            mismatched = priced[(priced["total_harga"].astype(float) - expected).abs() > tolerance]
+            for row in mismatched.itertuples():
+                violations.append({"check": "total_harga_mismatch", "table": transaksi_table, "id": row.id,
+                                   "detail": f"total_harga {row.total_harga} != jumlah_beras {row.jumlah_beras} "
+                                             f"x current harga_per_kg {row.harga_per_kg}",
+                                   "expected": round(float(row.jumlah_beras) * float(row.harga_per_kg), 2),
+                                   "actual": float(row.total_harga)})
+        else:
+            cursor.execute(f"""
+                SELECT z.id, z.jumlah, COALESCE(SUM(t.total_harga), 0) AS total_distributed
+                FROM {zakat_table} z
+                LEFT JOIN {transaksi_table} t ON t.id_zakat = z.id
+                WHERE z.id BETWEEN %s AND %s
+                GROUP BY z.id, z.jumlah
+            """, (lo, hi))
+            df = pd.DataFrame(cursor.fetchall(), columns=["id", "jumlah", "total_distributed"])
+            exceeded = df[df["total_distributed"].astype(float) - df["jumlah"].astype(float) > tolerance]
+            for row in exceeded.itertuples():
+                violations.append({"check": "over_distribution", "table": zakat_table, "id": row.id,
+                                   "detail": f"distributed {row.total_distributed} exceeds donation {row.jumlah}",
+                                   "expected": float(row.jumlah), "actual": float(row.total_distributed)})
+    finally:
+        cursor.close()
+    return violations
+
+class ServiceError(Exception):
+    """Client error returned by the service as a JSON error response"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceCursor:
+    """Dictionary cursor over a MySQL or SQLite connection that accepts MySQL-style queries"""
+    
+    def __init__(self, conn, sqlite):
+        self.sqlite = sqlite
+        self.cursor = conn.cursor() if sqlite else conn.cursor(dictionary=True)
+    
+    def translate(self, query):
+        """Rewrite MySQL placeholders and INSERT IGNORE for SQLite"""
+        if self.sqlite:
+            query = query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+        return query
+    
+    def execute(self, query, params=None):
+        self.cursor.execute(self.translate(query), params or ())
+    
+    def executemany(self, query, seq_params):
+        self.cursor.executemany(self.translate(query), seq_params)
+    
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        return [dict(row) for row in rows] if self.sqlite else rows
+    
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return dict(row) if self.sqlite and row is not None else row
+    
+    @property
+    def description(self):
+        return self.cursor.description
+    
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+    
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+    
+    def close(self):
+        self.cursor.close()
+
+
+class ZakatService:
+    """Local HTTP/JSON service exposing ZakatManager operations to many desks over a few shared connections"""
+    
+    def __init__(self, manager, pool_size=5, request_timeout=10.0, max_pending=100, sqlite_path=None):
+        self.manager = manager
+        self.pool_size = pool_size
+        self.request_timeout = request_timeout
+        self.max_pending = max_pending
+        self.sqlite_path = sqlite_path
+        self.pool = None
+        self.connections = []
+        self.pending = 0
+        self.commit_lock = threading.Lock()
+        self.routes = [
+            ("GET", r"/zakat", self.list_zakat),
+            ("POST", r"/zakat", self.create_zakat),
+            ("GET", r"/zakat/(?P<id>\d+)", self.get_zakat),
+            ("PUT", r"/zakat/(?P<id>\d+)", self.update_zakat),
+            ("DELETE", r"/zakat/(?P<id>\d+)", self.delete_zakat),
+            ("GET", r"/beras", self.list_beras),
+            ("POST", r"/beras", self.create_beras),
+            ("PUT", r"/beras/(?P<id>\d+)", self.update_beras),
+            ("GET", r"/transaksi", self.list_transaksi),
+            ("POST", r"/transaksi", self.create_transaksi),
+            ("POST", r"/export", self.export_excel),
+        ]
+    
+    def connect(self):
+        """Open one pooled database connection"""
+        if self.sqlite_path:
+            conn = sqlite3.connect(self.sqlite_path, check_same_thread=False, timeout=self.request_timeout)
+            conn.row_factory = sqlite3.Row
+            return conn
+        return mysql.connector.connect(**self.manager.db_config, autocommit=False, connection_timeout=5)
+    
+    async def open_pool(self):
+        """Fill the shared connection pool"""
+        self.pool = asyncio.Queue()
+        for _ in range(self.pool_size):
+            conn = await asyncio.to_thread(self.connect)
+            self.connections.append(conn)
+            self.pool.put_nowait(conn)
+    
+    def close_pool(self):
+        """Close every pooled connection"""
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+    
+    async def run_db(self, request, handler, *args):
+        """Run a blocking handler on a pooled connection in a worker thread, as one transaction.
+        If the request times out before the handler finishes, the transaction is rolled back."""
+        conn = await self.pool.get()
+        
+        def work():
+            if not self.sqlite_path:
+                conn.ping(reconnect=True, attempts=1)
+            cursor = ServiceCursor(conn, bool(self.sqlite_path))
+            try:
+                result = handler(cursor, *args)
+                # Decide under the lock so a timeout either lands before the commit or reports it
+                with self.commit_lock:
+                    request['committing'] = not request['timed_out']
+                if request['committing']:
+                    conn.commit()
+                else:
+                    conn.rollback()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        
+        def release(task):
+            # The connection only goes back once the thread is done, even if the request timed out
+            if not task.cancelled():
+                task.exception()
+            self.pool.put_nowait(conn)
+        
+        task = asyncio.ensure_future(asyncio.to_thread(work))
+        task.add_done_callback(release)
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            with self.commit_lock:
+                request['timed_out'] = True
+            raise
+    
+    def json_default(self, value):
+        """Serialize database values that json doesn't handle natively"""
+        if isinstance(value, Decimal):
+            return float(value)
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+    
+    async def send_json(self, writer, status, payload, keep_alive=True):
+        """Write a JSON HTTP response"""
+        body = json.dumps(payload, default=self.json_default).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+    
+    async def handle_client(self, reader, writer):
+        """Serve HTTP/1.1 requests on one keep-alive client connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send_json(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close"
+                
+                status, payload = await self.handle_request(method.upper(), target, body)
+                await self.send_json(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def handle_request(self, method, target, body):
+        """Apply backpressure and the request timeout around one request"""
+        if self.pending >= self.max_pending:
+            return 503, {"error": "Server busy, please retry"}
+        self.pending += 1
+        request = {"timed_out": False, "committing": False}
+        try:
+            return await asyncio.wait_for(self.dispatch(request, method, target, body), self.request_timeout)
+        except asyncio.TimeoutError:
+            if request['committing']:
+                return 504, {"error": "Request timed out while committing; the change may have been applied"}
+            return 504, {"error": "Request timed out; no changes were applied"}
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except mysql.connector.Error as err:
+            return 500, {"error": f"Database error: {err}"}
+        except Exception as e:
+            return 500, {"error": f"Unexpected error: {e}"}
+        finally:
+            self.pending -= 1
+    
+    async def dispatch(self, request, method, target, body):
+        """Route a request to its handler and run it on a pooled connection"""
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            data = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            raise ServiceError(400, "Request body must be valid JSON")
+        if not isinstance(data, dict):
+            raise ServiceError(400, "Request body must be a JSON object")
+        
+        path_matched = False
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path.rstrip("/") or "/")
+            if not match:
+                continue
+            path_matched = True
+            if route_method == method:
+                return await self.run_db(request, handler, match.groupdict(), query, data)
+        if path_matched:
+            raise ServiceError(405, f"Method {method} not allowed for {url.path}")
+        raise ServiceError(404, f"Unknown endpoint {url.path}")
+    
+    def parse_date(self, value, field, required=True):
+        """Validate a YYYY-MM-DD date that is not in the future"""
+        if value in (None, ""):
+            if required:
+                raise ServiceError(400, f"{field} is required")
+            return None
+        try:
+            date_obj = datetime.strptime(str(value), "%Y-%m-%d")
+        except ValueError:
+            raise ServiceError(400, f"{field} must use YYYY-MM-DD format")
+        if date_obj.date() > datetime.now().date():
+            raise ServiceError(400, f"{field} cannot be in the future")
+        return str(value)
+    
+    def parse_positive(self, value, field, cast=float, max_value=None):
+        """Validate a positive number, optionally capped"""
+        try:
+            number = cast(value)
+        except (TypeError, ValueError):
+            raise ServiceError(400, f"{field} must be a number")
+        if number <= 0:
+            raise ServiceError(400, f"{field} must be positive")
+        if max_value is not None and number > max_value:
+            raise ServiceError(400, f"{field} cannot exceed {max_value}")
+        return round(number, 2) if cast is float else number
+    
+    def parse_text(self, value, field):
+        """Validate a non-empty text field"""
+        if not isinstance(value, str) or not value.strip():
+            raise ServiceError(400, f"{field} cannot be empty")
+        return value.strip()
+    
+    def list_zakat(self, cursor, path, query, data):
+        start_date = self.parse_date(query.get("start_date"), "start_date", required=False)
+        end_date = self.parse_date(query.get("end_date"), "end_date", required=False)
+        id_donatur = query.get("id_donatur")
+        if id_donatur:
+            id_donatur = self.parse_positive(id_donatur, "id_donatur", cast=int)
+        sql, params = self.manager.zakat_summary_query(cursor, start_date, end_date, id_donatur)
+        cursor.execute(sql, params)
+        return 200, {"records": cursor.fetchall()}
+    
+    def get_zakat(self, cursor, path, query, data):
+        cursor.execute("SELECT * FROM zakat_data WHERE id = %s", (int(path['id']),))
+        record = cursor.fetchone()
+        if not record:
+            raise ServiceError(404, f"No zakat record found with ID {path['id']}")
+        return 200, record
+    
+    def has_donor_registry(self, cursor):
+        """Check whether the donor registry has been migrated into this database"""
+        try:
+            cursor.execute("SELECT id FROM donatur LIMIT 1")
+            cursor.fetchall()
+        except sqlite3.OperationalError:
+            return False
+        except mysql.connector.Error as err:
+            if err.errno == 1146:  # Registry tables don't exist yet
+                return False
+            raise
+        return True
+    
+    def resolve_donor(self, cursor, nama, data):
+        """Return the donor id for a record: the one given by the client, otherwise the
+        registered donor for this name (None before the registry migration)"""
+        if data.get("id_donatur"):
+            return self.parse_positive(data["id_donatur"], "id_donatur", cast=int)
+        if self.has_donor_registry(cursor):
+            return self.manager.get_or_create_donor(cursor, nama)
+        return None
+    
+    def create_zakat(self, cursor, path, query, data):
+        nama = self.parse_text(data.get("nama"), "nama")
+        jenis_zakat = self.parse_text(data.get("jenis_zakat"), "jenis_zakat")
+        jumlah = self.parse_positive(data.get("jumlah"), "jumlah")
+        tanggal = self.parse_date(data.get("tanggal"), "tanggal")
+        id_donatur = self.resolve_donor(cursor, nama, data)
+        if id_donatur:
+            cursor.execute("""
+                INSERT INTO zakat_data (nama, id_donatur, jenis_zakat, jumlah, tanggal)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (nama, id_donatur, jenis_zakat, jumlah, tanggal))
+        else:
+            cursor.execute("""
+                INSERT INTO zakat_data (nama, jenis_zakat, jumlah, tanggal)
+                VALUES (%s, %s, %s, %s)
+            """, (nama, jenis_zakat, jumlah, tanggal))
+        return 201, {"id": cursor.lastrowid, "id_donatur": id_donatur}
+    
+    def update_zakat(self, cursor, path, query, data):
+        status, record = self.get_zakat(cursor, path, query, data)
+        nama = self.parse_text(data.get("nama", record['nama']), "nama")
+        jenis_zakat = self.parse_text(data.get("jenis_zakat", record['jenis_zakat']), "jenis_zakat")
+        jumlah = self.parse_positive(data.get("jumlah", record['jumlah']), "jumlah")
+        tanggal = self.parse_date(str(data.get("tanggal", record['tanggal'])), "tanggal")
+        if 'id_donatur' not in record:
+            cursor.execute("""
+                UPDATE zakat_data SET nama = %s, jenis_zakat = %s, jumlah = %s, tanggal = %s
+                WHERE id = %s
+            """, (nama, jenis_zakat, jumlah, tanggal, record['id']))
+            return 200, {"id": record['id'], "nama": nama, "jenis_zakat": jenis_zakat,
+                         "jumlah": jumlah, "tanggal": tanggal}
+        
+        # A renamed record is relinked to the donor of its new name
+        id_donatur = record['id_donatur']
+        if data.get("id_donatur") or nama != record['nama']:
+            id_donatur = self.resolve_donor(cursor, nama, data)
+        cursor.execute("""
+            UPDATE zakat_data SET nama = %s, id_donatur = %s, jenis_zakat = %s, jumlah = %s, tanggal = %s
+            WHERE id = %s
+        """, (nama, id_donatur, jenis_zakat, jumlah, tanggal, record['id']))
+        return 200, {"id": record['id'], "nama": nama, "id_donatur": id_donatur, "jenis_zakat": jenis_zakat,
+                     "jumlah": jumlah, "tanggal": tanggal}
+    
+    def delete_zakat(self, cursor, path, query, data):
+        status, record = self.get_zakat(cursor, path, query, data)
+        cursor.execute("SELECT COUNT(*) AS jumlah FROM transaksi_zakat WHERE id_zakat = %s", (record['id'],))
+        dependent_count = cursor.fetchone()['jumlah']
+        if dependent_count > 0:
+            raise ServiceError(409, f"Cannot delete: this record has {dependent_count} associated distribution(s)")
+        cursor.execute("DELETE FROM zakat_data WHERE id = %s", (record['id'],))
+        return 200, {"deleted": record['id']}
+    
+    def list_beras(self, cursor, path, query, data):
+        cursor.execute("SELECT * FROM master_beras ORDER BY nama_beras")
+        return 200, {"records": cursor.fetchall()}
+    
+    def create_beras(self, cursor, path, query, data):
+        nama_beras = self.parse_text(data.get("nama_beras"), "nama_beras")
+        harga_per_kg = self.parse_positive(data.get("harga_per_kg"), "harga_per_kg", max_value=1000)
+        cursor.execute("SELECT id FROM master_beras WHERE nama_beras = %s", (nama_beras,))
+        if cursor.fetchone():
+            raise ServiceError(409, f"Rice type '{nama_beras}' already exists")
+        cursor.execute("INSERT INTO master_beras (nama_beras, harga_per_kg) VALUES (%s, %s)",
+                       (nama_beras, harga_per_kg))
+        return 201, {"id": cursor.lastrowid}
+    
+    def update_beras(self, cursor, path, query, data):
+        harga_per_kg = self.parse_positive(data.get("harga_per_kg"), "harga_per_kg", max_value=1000)
+        cursor.execute("UPDATE master_beras SET harga_per_kg = %s WHERE id = %s", (harga_per_kg, int(path['id'])))
+        if cursor.rowcount == 0:
+            raise ServiceError(404, f"No rice type found with ID {path['id']}")
+        return 200, {"id": int(path['id']), "harga_per_kg": harga_per_kg}
+    
+    def list_transaksi(self, cursor, path, query, data):
+        filter_id = query.get("zakat_id")
+        if filter_id:
+            filter_id = self.parse_positive(filter_id, "zakat_id", cast=int)
+        start_date = self.parse_date(query.get("start_date"), "start_date", required=False)
+        end_date = self.parse_date(query.get("end_date"), "end_date", required=False)
+        sql, params = self.manager.transaksi_query(cursor, filter_id, start_date, end_date)
+        cursor.execute(sql, params)
+        return 200, {"records": cursor.fetchall()}
+    
+    def create_transaksi(self, cursor, path, query, data):
+        id_zakat = self.parse_positive(data.get("id_zakat"), "id_zakat", cast=int)
+        id_beras = self.parse_positive(data.get("id_beras"), "id_beras", cast=int)
+        jumlah_beras = self.parse_positive(data.get("jumlah_beras"), "jumlah_beras")
+        tanggal = self.parse_date(data.get("tanggal"), "tanggal")
+        
+        cursor.execute("SELECT id FROM zakat_data WHERE id = %s", (id_zakat,))
+        if not cursor.fetchone():
+            raise ServiceError(404, f"No zakat record found with ID {id_zakat}")
+        cursor.execute("SELECT harga_per_kg FROM master_beras WHERE id = %s", (id_beras,))
+        beras_record = cursor.fetchone()
+        if not beras_record:
+            raise ServiceError(404, f"No rice type found with ID {id_beras}")
+        
+        total_harga = round(float(beras_record['harga_per_kg']) * jumlah_beras, 2)
+        cursor.execute("""
+            INSERT INTO transaksi_zakat (id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (id_zakat, id_beras, jumlah_beras, total_harga, tanggal))
+        return 201, {"id": cursor.lastrowid, "total_harga": total_harga}
+    
+    def export_excel(self, cursor, path, query, data):
+        start_date = self.parse_date(data.get("start_date"), "start_date", required=False)
+        end_date = self.parse_date(data.get("end_date"), "end_date", required=False)
+        return 201, {"filename": self.manager.write_excel_report(cursor, start_date, end_date)}
+    
+    async def serve_forever(self, host="127.0.0.1", port=8080):
+        """Open the pool and serve requests until interrupted"""
+        await self.open_pool()
+        try:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            backend = f"SQLite stand-in '{self.sqlite_path}'" if self.sqlite_path else "MySQL"
+            print(f"✅ Zakat service listening on http://{host}:{port} "
+                  f"({backend}, {self.pool_size} connections, {self.request_timeout}s timeout)")
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close_pool()
+
+
+def create_sqlite_standin(path, donations=1000):
+    """Create and seed a SQLite copy of the zakat schema for local load testing"""
+    if os.path.exists(path):
+        return
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE zakat_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nama TEXT NOT NULL,
+                jenis_zakat TEXT NOT NULL,
+                jumlah REAL NOT NULL,
+                tanggal TEXT NOT NULL,
+                id_donatur INTEGER
+            );
+            CREATE TABLE master_beras (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nama_beras TEXT NOT NULL UNIQUE,
+                harga_per_kg REAL NOT NULL
+            );
+            CREATE TABLE transaksi_zakat (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_zakat INTEGER NOT NULL REFERENCES zakat_data(id),
+                id_beras INTEGER NOT NULL REFERENCES master_beras(id),
+                jumlah_beras REAL NOT NULL,
+                total_harga REAL NOT NULL,
+                tanggal TEXT NOT NULL
+            );
+            CREATE TABLE archive_log (
+                tahun INTEGER PRIMARY KEY,
+                zakat_rows INTEGER NOT NULL DEFAULT 0,
+                transaksi_rows INTEGER NOT NULL DEFAULT 0,
+                archived_at TEXT NOT NULL
+            );
+            CREATE INDEX idx_zakat_data_tanggal ON zakat_data (tanggal);
+            CREATE INDEX idx_transaksi_zakat_zakat ON transaksi_zakat (id_zakat);
+        """)
+        beras = [("Pandan Wangi", 15.5), ("Rojolele", 14.0), ("IR64", 12.0), ("Setra Ramos", 13.5)]
+        conn.executemany("INSERT INTO master_beras (nama_beras, harga_per_kg) VALUES (?, ?)", beras)
+        year = datetime.now().year
+        zakat_rows = [
+            (f"Donor {i % 300}", rng.choice(["Fitrah", "Mal", "Profesi"]), round(rng.uniform(50, 500), 2),
+             f"{year}-01-{rng.randint(1, 28):02d}")
+            for i in range(donations)
+        ]
+        conn.executemany("INSERT INTO zakat_data (nama, jenis_zakat, jumlah, tanggal) VALUES (?, ?, ?, ?)",
+                         zakat_rows)
+        transaksi_rows = []
+        for id_zakat, (_, _, jumlah, _) in enumerate(zakat_rows, start=1):
+            id_beras = rng.randint(1, len(beras))
+            # Never distribute more than the donation is worth
+            jumlah_beras = round(rng.uniform(1, jumlah / beras[id_beras - 1][1]) * 0.99, 2)
+            transaksi_rows.append((id_zakat, id_beras, jumlah_beras,
+                                   round(beras[id_beras - 1][1] * jumlah_beras, 2), f"{year}-02-01"))
+        conn.executemany("""
+            INSERT INTO transaksi_zakat (id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
+            VALUES (?, ?, ?, ?, ?)
+        """, transaksi_rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def run_load_test(url, total_requests=2000, concurrency=50, write_ratio=0.1):
+    """Drive the service with concurrent keep-alive clients and report requests/s and latency"""
+    target = urlsplit(url)
+    host, port = target.hostname or "127.0.0.1", target.port or 80
+    rng = random.Random(0)
+    reads = ["/zakat?start_date=" + f"{datetime.now().year}-01-01", "/beras", "/transaksi?zakat_id=1"]
+    latencies = []
+    statuses = {}
+    remaining = [total_requests]
+    
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                if rng.random() < write_ratio:
+                    body = json.dumps({"nama": "Load Test", "jenis_zakat": "Fitrah", "jumlah": 100,
+                                       "tanggal": datetime.now().strftime("%Y-%m-%d")}).encode("utf-8")
+                    request = (f"POST /zakat HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                               f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+                else:
+                    request = f"GET {rng.choice(reads)} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1")
+                
+                started = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status = int((await reader.readline()).split()[1])
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))] * 1000
+    
+    result = {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(0.50), 2),
+        "p99_ms": round(percentile(0.99), 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "statuses": statuses,
+    }
+    print("\n--- Load Test Results ---")
+    print(f"Requests: {result['requests']} in {result['seconds']}s with {concurrency} clients")
+    print(f"Throughput: {result['requests_per_second']} requests/s")
+    print(f"Latency: p50 {result['p50_ms']}ms | p99 {result['p99_ms']}ms | max {result['max_ms']}ms")
+    print(f"Status codes: {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+    return result
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments for non-interactive maintenance commands"""
+    parser = argparse.ArgumentParser(description="Zakat Management System")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Record time and memory of exports, backups and zakat listings "
+                             f"to {ZakatManager.PROFILE_REPORT_FILE}")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    archive_parser = subparsers.add_parser("archive", help="Move closed years into the archive tables")
+    archive_parser.add_argument("--through-year", type=int, required=True,
+                                help="Last year to archive (must be before the current year)")
+    
+    subparsers.add_parser("migrate-donors", help="Build the donor registry from existing zakat records")
+    
+    subparsers.add_parser("setup-cache", help="Install the change counters that let listings reuse cached results")
+    
+    statements_parser = subparsers.add_parser("statements", help="Generate year-end statements for every donor")
+    statements_parser.add_argument("--year", type=int, required=True, help="Statement year")
+    statements_parser.add_argument("--format", choices=["csv", "xlsx"], default="xlsx", help="Output file format")
+    statements_parser.add_argument("--workers", type=int, default=None,
+                                   help="Number of worker processes (default: CPU count)")
+    statements_parser.add_argument("--fresh", action="store_true",
+                                   help="Regenerate all statements instead of resuming")
+    
+    serve_parser = subparsers.add_parser("serve", help="Run the HTTP/JSON service for many desks")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    serve_parser.add_argument("--pool-size", type=int, default=5, help="Shared database connections")
+    serve_parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    serve_parser.add_argument("--max-pending", type=int, default=100,
+                              help="Requests in flight before new ones are rejected with 503")
+    serve_parser.add_argument("--sqlite", metavar="PATH",
+                              help="Serve a seeded SQLite stand-in instead of MySQL")
+    
+    loadtest_parser = subparsers.add_parser("loadtest", help="Measure service requests/s and p99 latency")
+    loadtest_parser.add_argument("--url", default="http://127.0.0.1:8080", help="Service base URL")
+    loadtest_parser.add_argument("--requests", type=int, default=2000, help="Total requests to send")
+    loadtest_parser.add_argument("--concurrency", type=int, default=50, help="Concurrent client connections")
+    loadtest_parser.add_argument("--write-ratio", type=float, default=0.1, help="Share of requests that add a record")
+    
+    verify_parser = subparsers.add_parser(
+        "verify", help="Scan for integrity violations (exit status 0 = clean, 1 = violations, 2 = error); "
+                       "totals that differ from the current rice price are reported as warnings only"
+    )
+    verify_parser.add_argument("--workers", type=int, default=None,
+                               help="Number of worker processes (default: CPU count)")
+    verify_parser.add_argument("--chunk-size", type=int, default=ZakatManager.INTEGRITY_CHUNK_SIZE,
+                               help="Ids per parallel range")
+    verify_parser.add_argument("--report", metavar="PATH", help="Where to write the JSON violation report")
+    
+    args = parser.parse_args(argv)
+    if args.command == "verify" and args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")  # exits with status 2, like a failed scan
+    return args
+
 # Run the application
 if __name__ == "__main__":
     try:
+        args = parse_args()
         manager = ZakatManager()
-        manager.main_menu()
+        manager.profiling = args.profile
+        if args.command == "archive":
+            manager.archive_closed_years(through_year=args.through_year, interactive=False)
+        elif args.command == "migrate-donors":
+            manager.migrate_donor_registry()
+        elif args.command == "setup-cache":
+            manager.setup_change_counters()
+        elif args.command == "statements":
+            manager.generate_donor_statements(year=args.year, fmt=args.format,
+                                              workers=args.workers, resume=not args.fresh)
+        elif args.command == "serve":
+            if args.sqlite:
+                create_sqlite_standin(args.sqlite)
+            service = ZakatService(manager, pool_size=args.pool_size, request_timeout=args.timeout,
+                                   max_pending=args.max_pending, sqlite_path=args.sqlite)
+            asyncio.run(service.serve_forever(args.host, args.port))
+        elif args.command == "loadtest":
+            asyncio.run(run_load_test(args.url, args.requests, args.concurrency, args.write_ratio))
+        elif args.command == "verify":
+            sys.exit(manager.verify_integrity(workers=args.workers, chunk_size=args.chunk_size,
+                                              report_file=args.report))
+        else:
+            manager.main_menu()
     except KeyboardInterrupt:
         print("\n\nApplication terminated by user.")
         sys.exit(0)